@@ -11,18 +11,25 @@ Final stable script:
 """
 
 import traceback
+import html
 import streamlit as st
-import pandas as pd
-import sqlite3
 from datetime import datetime, timedelta
-import io
-import altair as alt
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import os
-from dotenv import load_dotenv
-from PIL import Image
+import time
+from helpdesk_attachments import AttachmentRejected
+from helpdesk_db import (
+    Database, transaction, query_tickets, changes_since, merge_changes, change_generation,
+    get_ticket, distinct_assignees, search_tickets, find_duplicates, duplicate_groups,
+    read_attachment, get_thumbnail, get_ticket_contact,
+    report_daily_counts, report_breakdown, resolution_stats, SLA_HOURS,
+    DEPARTMENTS, CATEGORIES, PRIORITIES, STATUSES,
+    add_ticket as db_add_ticket, update_ticket as db_update_ticket,
+)
+from helpdesk_mail import IT_RECIPIENTS, OutboxWorker, queue_email, list_ticket_emails, outbox_stats
+from helpdesk_export import EXPORT_FORMATS, export_tickets
+from helpdesk_cache import QueryCache, QUERY_CACHE_SIZE
+from helpdesk_metrics import METRICS, MetricsExporter, METRICS_FILE
+from helpdesk_sla import SlaWorker, sla_state, ticket_breach, overdue_counts
 
 # Options
 st.set_option("client.showErrorDetails", True)
@@ -32,150 +39,72 @@ st.set_page_config(page_title="Infinium Pharmachem Limited | IT Helpdesk", layou
 LOGO_FILE = "logo.png"  # not required; script will ignore if not present
 DB_PATH = "tickets.db"
 ADMIN_PASSWORD = "ipl123"
+DASHBOARD_POLL_SECONDS = 3  # live dashboard: how often the change counter is checked
+DUPLICATE_GROUPS_SHOWN = 10
 
-# Load .env
-load_dotenv()
-SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
-SMTP_PORT = int(os.getenv("SMTP_PORT", "587") or 587)
-SMTP_USER = os.getenv("SMTP_USER") or ""
-SMTP_PASSWORD = os.getenv("SMTP_PASSWORD") or ""
-FROM_EMAIL = os.getenv("FROM_EMAIL") or SMTP_USER
-IT_RECIPIENTS = [x.strip() for x in os.getenv("IT_RECIPIENTS", "").split(",") if x.strip()]
-
-# Database init
-def init_db():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS tickets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ticket_id TEXT,
-            employee_name TEXT,
-            department TEXT,
-            contact TEXT,
-            identification TEXT,
-            category TEXT,
-            priority TEXT,
-            description TEXT,
-            attachment BLOB,
-            attachment_name TEXT,
-            status TEXT,
-            assigned_to TEXT,
-            raised_at TEXT,
-            resolved_at TEXT,
-            resolution_notes TEXT
-        )
-    """)
-    conn.commit()
-    return conn
-
-conn = init_db()
+# Data access: one Database per server process; each script run reads through its
+# thread's own connection and all writes go through the shared, serialized writer
+@st.cache_resource
+def get_database():
+    return Database(DB_PATH)
 
-# Helpers
-def generate_ticket_id(conn):
-    today = datetime.now().strftime("%Y-%m-%d")
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM tickets WHERE raised_at LIKE ?", (f"{today}%",))
-    count = (c.fetchone()[0] if c.fetchone() is None else None)  # avoid double fetch
-    # safer approach: fetch once
-    c.execute("SELECT COUNT(*) FROM tickets WHERE raised_at LIKE ?", (f"{today}%",))
-    row = c.fetchone()
-    cnt = (row[0] if row else 0) + 1
-    return f"{today}-{str(cnt).zfill(3)}"
+database = get_database()
+conn = database.reader()
+writer = database.writer
 
+# Helpers
 def is_email(s):
     return isinstance(s, str) and ("@" in s) and ("." in s)
 
-# Email function
-def send_email(subject, ticket_info, to_list, cc=None):
-    """
-    Returns (ok:bool, err_msg or None)
-    """
-    try:
-        if not SMTP_USER or not SMTP_PASSWORD:
-            return False, "SMTP credentials not configured."
-
-        msg = MIMEMultipart("alternative")
-        msg["From"] = FROM_EMAIL
-        msg["To"] = ", ".join(to_list)
-        if cc:
-            msg["Cc"] = ", ".join(cc)
-        msg["Subject"] = subject
-
-        color = "#eab308" if ticket_info.get("status") == "In Progress" else "#16a34a"
-        html = f"""
-        <html><body style='font-family:Segoe UI,Arial,sans-serif;background:#f3f4f6;padding:20px;'>
-        <div style='max-width:600px;margin:auto;background:#fff;border-radius:10px;overflow:hidden;'>
-        <div style='background:#0f172a;color:#fff;padding:12px 20px;'>
-        <b>Infinium IT Helpdesk</b>
-        </div>
-        <div style='padding:20px;color:#111827;'>
-        <p>Dear <b>{ticket_info.get('employee_name','User')}</b>,</p>
-        <p>Your ticket has been updated:</p>
-        <table style='width:100%;border-collapse:collapse;margin:10px 0;'>
-        <tr><td><b>Ticket ID:</b></td><td>{ticket_info.get('ticket_id','')}</td></tr>
-        <tr><td><b>Status:</b></td><td style='color:{color};font-weight:bold'>{ticket_info.get('status','')}</td></tr>
-        <tr><td><b>Category:</b></td><td>{ticket_info.get('category','')}</td></tr>
-        <tr><td><b>Priority:</b></td><td>{ticket_info.get('priority','')}</td></tr>
-        </table>
-        <p><b>Description:</b><br>{ticket_info.get('description','')}</p>
-        <p><b>Resolution Notes:</b><br>{ticket_info.get('resolution_notes','(Not provided)')}</p>
-        <p>Regards,<br><b>Prince Prajapati</b><br>IT Officer – Infinium Pharmachem Limited</p>
-        </div>
-        </div></body></html>
-        """
-        msg.attach(MIMEText(html, "html", "utf-8"))
+# Email outbox worker (one per server process; survives reruns)
+@st.cache_resource
+def start_outbox_worker():
+    worker = OutboxWorker(database)
+    worker.start()
+    return worker
+
+outbox_worker = start_outbox_worker()
 
-        # Build recipients list (To + Cc)
-        recipients = list(to_list)
-        if cc:
-            recipients += list(cc)
+# SLA breach scanner (one per server process; digests go out through the outbox)
+@st.cache_resource
+def start_sla_worker():
+    worker = SlaWorker(database, on_queued=outbox_worker.wake)
+    worker.start()
+    return worker
 
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as server:
-            server.ehlo()
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.sendmail(FROM_EMAIL, recipients, msg.as_string())
+sla_worker = start_sla_worker()
 
-        return True, None
-    except Exception as e:
-        return False, str(e)
+# Shared read cache (all sessions; invalidated by the tickets change counter)
+@st.cache_resource
+def get_query_cache():
+    return QueryCache(QUERY_CACHE_SIZE)
+
+query_cache = get_query_cache()
+
+def cached(fn, *args, **kwargs):
+    return query_cache.call(conn, fn, *args, **kwargs)
+
+# Prometheus text file with the rolling timings (one writer thread per server process)
+@st.cache_resource
+def start_metrics_exporter():
+    exporter = MetricsExporter(METRICS_FILE)
+    exporter.start()
+    return exporter
+
+metrics_exporter = start_metrics_exporter()
 
 # Ticket DB operations
 def add_ticket(data):
-    c = conn.cursor()
-    c.execute('''INSERT INTO tickets
-                 (ticket_id, employee_name, department, contact, identification, category,
-                  priority, description, attachment, attachment_name, status, assigned_to, raised_at)
-                 VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)''',
-              (data["ticket_id"], data["employee_name"], data["department"], data["contact"],
-               data.get("identification",""), data["category"], data["priority"],
-               data["description"], data.get("attachment"), data.get("attachment_name"),
-               "Open", "", datetime.now().isoformat()))
-    conn.commit()
-
-def fetch_tickets():
-    c = conn.cursor()
-    c.execute("SELECT * FROM tickets ORDER BY raised_at DESC")
-    cols = [d[0] for d in c.description] if c.description else []
-    rows = c.fetchall()
-    return pd.DataFrame(rows, columns=cols) if rows else pd.DataFrame(columns=cols)
+    return db_add_ticket(writer, data)
 
-def update_ticket(ticket_id, updates):
-    c = conn.cursor()
-    set_clause = ", ".join([f"{k}=?" for k in updates.keys()])
-    params = list(updates.values()) + [ticket_id]
-    c.execute(f"UPDATE tickets SET {set_clause} WHERE ticket_id=?", params)
-    conn.commit()
+def _apply_update(ticket_id, updates):
+    db_update_ticket(writer, ticket_id, updates)
 
-    # send email on status change to In Progress or Resolved
+    # queue email on status change to In Progress or Resolved (sent by the outbox worker)
     if updates.get("status") in ["In Progress", "Resolved"]:
-        c.execute("SELECT employee_name, contact, category, priority, description FROM tickets WHERE ticket_id=?", (ticket_id,))
-        row = c.fetchone()
-        if not row:
-            return
-        name, contact, category, priority, desc = row
-        if is_email(contact):
+        row = get_ticket_contact(writer, ticket_id)
+        if row and is_email(row[1]):
+            name, contact, category, priority, desc = row
             ticket_info = {
                 "ticket_id": ticket_id,
                 "employee_name": name,
@@ -186,18 +115,24 @@ def update_ticket(ticket_id, updates):
                 "resolution_notes": updates.get("resolution_notes", "")
             }
             subject = f"[Ticket {ticket_id}] {updates['status']} - Infinium IT Helpdesk"
-            ok, err = send_email(subject, ticket_info, [contact], cc=IT_RECIPIENTS)
-            # show feedback
-            if ok:
-                st.info(f"📧 Email sent to {contact}")
-            else:
-                st.warning(f"⚠️ Email sending failed: {err}")
+            queue_email(writer, subject, ticket_info, [contact], cc=IT_RECIPIENTS)
+            return contact
+    return None
+
+def update_tickets(ticket_ids, updates):
+    # one transaction for all of them (and their notification emails)
+    with transaction(writer):
+        queued_to = [contact for contact in (_apply_update(t, updates) for t in ticket_ids) if contact]
+    if queued_to:
+        outbox_worker.wake()
+        st.info(f"📧 Email queued for {', '.join(queued_to)}")
+
+def update_ticket(ticket_id, updates):
+    update_tickets([ticket_id], updates)
 
-def df_to_excel_bytes(df):
-    with io.BytesIO() as buffer:
-        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="Tickets")
-        return buffer.getvalue()
+def resolve_duplicates(primary_id, ticket_ids):
+    update_tickets(ticket_ids, {"status": "Resolved", "resolved_at": datetime.now().isoformat(),
+                                "resolution_notes": f"Duplicate of {primary_id}"})
 
 # CSS
 st.markdown("""
@@ -239,19 +174,13 @@ def main():
         if st.session_state.role == "User":
             page = st.selectbox("Navigate", ["Submit Ticket", "Future Updates", "Contact Us"], key="nav_user")
         else:
-            page = st.selectbox("Navigate", ["Submit Ticket", "IT Officer Dashboard", "Reports & Export", "Future Updates", "Contact Us"], key="nav_officer")
+            page = st.selectbox("Navigate", ["Submit Ticket", "IT Officer Dashboard", "Reports & Export", "Performance", "Future Updates", "Contact Us"], key="nav_officer")
         st.markdown("---")
 
     # Header
     st.markdown(f"<h1 class='header-title'>Infinium Pharmachem Limited | IT Helpdesk</h1>", unsafe_allow_html=True)
     st.markdown("<hr>", unsafe_allow_html=True)
 
-    # Departments list
-    DEPARTMENTS = [
-        "Select...", "Accounts","HR","Purchase","CA/CS/CFO","Import/Export","Sales","DEO",
-        "Production","Admin & Logistics","QA","QC","Micro","R&D","Engineering","Manufacturing"
-    ]
-
     # Determine page from sidebar widget keys
     # (one of the two nav widgets exists; check st.session_state)
     if st.session_state.get("nav_user"):
@@ -259,6 +188,7 @@ def main():
     elif st.session_state.get("nav_officer"):
         page = st.session_state["nav_officer"]
     # else page variable is already set from earlier
+    page_started = time.perf_counter()
 
     # Submit Ticket
     if page == "Submit Ticket":
@@ -267,11 +197,11 @@ def main():
             col1, col2 = st.columns([2,1])
             with col1:
                 employee_name = st.text_input("Your Name *", key="fname")
-                department = st.selectbox("Department *", DEPARTMENTS, key="dept")
+                department = st.selectbox("Department *", ["Select..."] + DEPARTMENTS, key="dept")
                 contact = st.text_input("Contact (Email / Phone)", key="contact")
                 identification = st.text_input("Employee ID (optional)", key="ident")
-                category = st.selectbox("Issue Category *", ["Select...","Network","Printer","Email","Software","Hardware","Access","Other"], key="cat")
-                priority = st.selectbox("Priority *", ["Select...","Low","Medium","High","Critical"], index=1, key="prio")
+                category = st.selectbox("Issue Category *", ["Select..."] + CATEGORIES, key="cat")
+                priority = st.selectbox("Priority *", ["Select..."] + PRIORITIES, index=1, key="prio")
                 description = st.text_area("Describe the Issue", height=140, key="desc")
             with col2:
                 st.info("Attach screenshot or file (optional)")
@@ -290,9 +220,7 @@ def main():
                     elif priority == "Select...":
                         st.error("⚠️ Please select a priority.")
                     else:
-                        ticket_id = generate_ticket_id(conn)
                         data = {
-                            "ticket_id": ticket_id,
                             "employee_name": employee_name.strip(),
                             "department": department,
                             "contact": contact.strip(),
@@ -303,9 +231,16 @@ def main():
                             "attachment": file_bytes,
                             "attachment_name": uploaded_file.name if uploaded_file else ""
                         }
-                        add_ticket(data)
+                        similar = find_duplicates(conn, category, data["description"], limit=3)
+                        ticket_id = add_ticket(data)
                         st.success(f"✅ Ticket {ticket_id} submitted successfully!")
+                        if similar:
+                            st.info("ℹ️ Similar open tickets were already raised — IT may be working on this issue:\n\n"
+                                    + "\n".join(f"- **{t['ticket_id']}** · {t['status']} · {html.escape(t['description'][:120])}"
+                                                 for t in similar))
                         st.balloons()
+                except AttachmentRejected as e:
+                    st.error(f"⚠️ {e}")
                 except Exception as e:
                     st.error("❌ Ticket submission failed:")
                     st.code(traceback.format_exc())
@@ -317,52 +252,167 @@ def main():
             st.stop()
 
         st.subheader("🧑‍💻 IT Officer Dashboard")
-        df = fetch_tickets()
-        if df.empty:
-            st.info("No tickets yet.")
+        overdue = overdue_counts(conn)
+        if sum(overdue.values()):
+            st.warning(f"⏰ {sum(overdue.values())} open tickets past SLA — "
+                       + " · ".join(f"{p}: {n}" for p, n in overdue.items() if n))
+
+        # near-duplicate groups (LSH candidates confirmed by similarity); the oldest ticket of a
+        # group stays open and the rest can be resolved against it in one transaction.
+        # Only computed while the toggle is on, not on every dashboard render.
+        if st.toggle("🧩 Show possible duplicates", key="show_duplicates"):
+            groups = cached(duplicate_groups)
+            if not groups:
+                st.info("No possible duplicates among open tickets.")
+            else:
+                with st.expander(f"🧩 Possible duplicates: {len(groups)} groups, "
+                                 f"{sum(len(g) for g in groups)} open tickets", expanded=True):
+                    for g in groups[:DUPLICATE_GROUPS_SHOWN]:
+                        primary, rest = g[0], [t["ticket_id"] for t in g[1:]]
+                        st.markdown(f"**{primary['category']}** · {len(g)} tickets · "
+                                    f"“{html.escape((primary['description'] or '')[:100])}”")
+                        st.caption(" · ".join(t["ticket_id"] for t in g))
+                        st.button(f"✅ Resolve {len(rest)} as duplicates of {primary['ticket_id']}",
+                                  key=f"dup_{primary['ticket_id']}", on_click=resolve_duplicates,
+                                  args=(primary["ticket_id"], rest))
+
+        # full-text search (FTS5, ranked); replaces the filtered list while a query is entered
+        search_q = st.text_input("🔍 Search tickets", key="search_q", placeholder="e.g. vpn timeout, printer jam, outlook")
+        if search_q.strip():
+            df = cached(search_tickets, search_q, limit=50)
+            if df.empty:
+                st.info("No tickets match your search.")
+            for r in df.itertuples():
+                st.markdown(f"{'🗄️ ' if r.archived else ''}**{r.ticket_id}** · {r.status} · {r.priority} · {html.escape(r.employee_name or '')} — {r.snippet}", unsafe_allow_html=True)
         else:
-            # selection
+            # filters (applied in SQL)
+            with st.expander("🔎 Filters", expanded=False):
+                f1, f2, f3 = st.columns(3)
+                with f1:
+                    f_status = st.multiselect("Status", STATUSES, key="f_status")
+                    f_priority = st.multiselect("Priority", PRIORITIES, key="f_priority")
+                with f2:
+                    f_dept = st.multiselect("Department", DEPARTMENTS, key="f_dept")
+                    f_assignee = st.selectbox("Assigned To", ["(Any)", "(Unassigned)"] + cached(distinct_assignees), key="f_assignee")
+                with f3:
+                    f_from = st.date_input("Raised From", value=None, key="f_from")
+                    f_to = st.date_input("Raised To", value=None, key="f_to")
+                    page_size = st.selectbox("Page Size", [25, 50, 100], key="f_page_size")
+            filters = {"status": f_status, "priority": f_priority, "department": f_dept,
+                       "date_from": f_from, "date_to": f_to}
+            if f_assignee != "(Any)":
+                filters["assigned_to"] = "" if f_assignee == "(Unassigned)" else f_assignee
+
+            # keyset pagination: a stack of cursors, reset whenever the filters change
+            filter_key = repr((filters, page_size))
+            if st.session_state.get("dash_filter_key") != filter_key:
+                st.session_state.dash_filter_key = filter_key
+                st.session_state.dash_cursors = [None]
+            cursors = st.session_state.dash_cursors
+
+            # the page is loaded once per session and view, then kept current by merging
+            # only the rows changed since (changes_since); reloaded if that is not enough
+            view_key = (filter_key, cursors[-1])
+            generation = change_generation(conn)
+            live = st.session_state.get("dash_live")
+            if live and live["key"] == view_key and generation > live["seq"]:
+                changes = changes_since(conn, live["seq"], filters)
+                merged = changes and merge_changes(live["df"], live["next"], cursors[-1], page_size, *changes[:2])
+                live = dict(live, df=merged[0], next=merged[1], seq=changes[2]) if merged else None
+            if not live or live["key"] != view_key:
+                df, next_cursor = cached(query_tickets, filters, after=cursors[-1], limit=page_size)
+                live = {"key": view_key, "df": df, "next": next_cursor, "seq": generation}
+            st.session_state.dash_live = live
+            df, next_cursor = live["df"], live["next"]
+
+            if df.empty:
+                st.info("No tickets match the current filters." if len(cursors) == 1 else "No more tickets.")
+            else:
+                view = df.drop(columns=["id"])
+                view.insert(view.columns.get_loc("status") + 1, "sla",
+                            [sla_state(r)[0] for r in df.to_dict("records")])
+                st.dataframe(view, use_container_width=True, hide_index=True)
+            p1, p2, p3, p4 = st.columns([1, 1, 1, 3])
+            with p1:
+                st.button("⬅️ Previous", key="page_prev", disabled=len(cursors) == 1, on_click=cursors.pop)
+            with p2:
+                st.button("Next ➡️", key="page_next", disabled=next_cursor is None, on_click=cursors.append, args=(next_cursor,))
+            with p3:
+                st.toggle("🔄 Live", key="dash_live_updates", help="Refresh the list when tickets change")
+            with p4:
+                st.caption(f"Page {len(cursors)} · {len(df)} tickets · active tickets only (search also covers the archive)")
+
+        if not df.empty:
+            # selection (detail is fetched by its own query)
             ticket_ids = df["ticket_id"].tolist()
             selected_ticket = st.selectbox("🎟️ Select Ticket", ticket_ids, key="ticket_list")
-            ticket = df[df["ticket_id"] == selected_ticket].iloc[0]
+            ticket = cached(get_ticket, selected_ticket)
 
             st.markdown(f"### Ticket ID: {ticket['ticket_id']}")
+            archived = ticket.get("archived")
+            if archived:
+                st.caption("🗄️ Archived ticket (read-only)")
             st.write(f"**Employee:** {ticket['employee_name']}")
             st.write(f"**Department:** {ticket['department']}")
             st.write(f"**Category:** {ticket['category']}")
             st.write(f"**Priority:** {ticket['priority']}")
             st.write(f"**Status:** {ticket['status']}")
+            state, due = sla_state(ticket)
+            if state:
+                breach = ticket_breach(conn, ticket["ticket_id"])
+                notice = ""
+                if breach and breach["outbox_id"]:
+                    notice = {"sent": ", assignee notified", "failed": ", notification failed"}.get(
+                        breach["email_status"], ", notification queued")
+                elif breach and not breach["notified_at"]:
+                    notice = ", nobody notified (no recipient configured)"
+                st.write(f"**SLA:** {state} · due {due:%Y-%m-%d %H:%M}"
+                         + (f" · breach recorded {breach['detected_at'][:16].replace('T', ' ')}{notice}"
+                            if breach else ""))
             st.info(ticket["description"])
-
-            # attachment
-            if ticket.get("attachment"):
+            if not archived and ticket.get("status") != "Resolved":
+                similar = cached(find_duplicates, ticket["category"], ticket["description"], exclude=ticket["ticket_id"])
+                if similar:
+                    st.caption("🧩 Possible duplicates: " + ", ".join(
+                        f"{t['ticket_id']} ({t['similarity']:.0%})" for t in similar))
+
+            # attachment: thumbnail preview (made at upload); the original is read only for download
+            if ticket.get("attachment_id") is not None:
                 filename = ticket.get("attachment_name") or "attachment"
-                try:
-                    st.download_button("📎 Download Attachment", data=ticket["attachment"], file_name=filename, key=f"dl_{ticket['ticket_id']}")
-                except Exception:
-                    st.write(f"Attachment size: {len(ticket['attachment'])} bytes (download not available)")
-
-                if filename.lower().endswith(("png","jpg","jpeg")):
+                st.write(f"📎 **Attachment:** {filename} ({int(ticket['attachment_size']):,} bytes, {ticket['attachment_mime']})")
+                if ticket.get("attachment_has_thumbnail"):
+                    thumb = cached(get_thumbnail, int(ticket["attachment_id"]), archived=archived)
+                    if thumb:
+                        st.image(thumb, caption="Preview")
+                if st.button("📂 Fetch Original", key=f"open_att_{ticket['ticket_id']}"):
+                    data = read_attachment(conn, int(ticket["attachment_id"]), archived=archived)
+                    st.download_button("📎 Download Attachment", data=data, file_name=filename,
+                                       mime=ticket.get("attachment_mime"), key=f"dl_{ticket['ticket_id']}")
+
+            # update (archived tickets stay as they were resolved)
+            if not archived:
+                new_status = st.selectbox("Status", STATUSES, index=STATUSES.index(ticket.get("status") or "Open"), key="status_sel")
+                assigned_to = st.text_input("Assign To", value=ticket.get("assigned_to","") or "", key="assign_to")
+                notes = st.text_area("Resolution Notes", value=ticket.get("resolution_notes","") or "", key="res_notes")
+                if st.button("💾 Save Update", key="save_update_btn"):
+                    updates = {"status": new_status, "assigned_to": assigned_to, "resolution_notes": notes}
+                    if new_status == "Resolved":
+                        updates["resolved_at"] = datetime.now().isoformat()
                     try:
-                        st.image(Image.open(io.BytesIO(ticket["attachment"])), use_column_width=True)
+                        update_ticket(ticket["ticket_id"], updates)
+                        st.success(f"✅ Ticket {ticket['ticket_id']} updated successfully!")
+                        st.experimental_rerun()
                     except Exception:
-                        st.warning("Unable to preview attachment image.")
-
-            # update
-            new_status = st.selectbox("Status", ["Open", "In Progress", "Resolved"], index=["Open","In Progress","Resolved"].index(ticket.get("status","Open")), key="status_sel")
-            assigned_to = st.text_input("Assign To", value=ticket.get("assigned_to","") or "", key="assign_to")
-            notes = st.text_area("Resolution Notes", value=ticket.get("resolution_notes","") or "", key="res_notes")
-            if st.button("💾 Save Update", key="save_update_btn"):
-                updates = {"status": new_status, "assigned_to": assigned_to, "resolution_notes": notes}
-                if new_status == "Resolved":
-                    updates["resolved_at"] = datetime.now().isoformat()
-                try:
-                    update_ticket(ticket["ticket_id"], updates)
-                    st.success(f"✅ Ticket {ticket['ticket_id']} updated successfully!")
-                    st.experimental_rerun()
-                except Exception:
-                    st.error("Update failed:")
-                    st.code(traceback.format_exc())
+                        st.error("Update failed:")
+                        st.code(traceback.format_exc())
+
+            # email delivery status (from the outbox)
+            emails = list_ticket_emails(conn, ticket["ticket_id"])
+            if emails:
+                st.markdown("#### 📧 Email Notifications")
+                import pandas as pd
+                st.dataframe(pd.DataFrame(emails)[["created_at", "to_addrs", "status", "attempts", "sent_at", "last_error"]],
+                             use_container_width=True, hide_index=True)
 
     # Reports & Export
     elif page == "Reports & Export":
@@ -370,31 +420,119 @@ def main():
             st.warning("Access denied — IT Officers only.")
             st.stop()
 
+        import altair as alt  # charts are only needed here
         st.subheader("📊 Ticket Reports & Export")
-        df = fetch_tickets()
-        if df.empty:
-            st.info("No tickets yet.")
+        today = datetime.now().date()
+        presets = {
+            "Today": (today, today),
+            "Last 7 Days": (today - timedelta(days=6), today),
+            "Last 30 Days": (today - timedelta(days=29), today),
+            "Last 6 Months": (today - timedelta(days=182), today),
+            "Last 12 Months": (today - timedelta(days=365), today)
+        }
+        sel = st.selectbox("Range", list(presets.keys()), key="report_range")
+        start_d, end_d = presets[sel]
+
+        # counts come from the daily rollup table; resolution stats are computed in SQL
+        count_df = cached(report_daily_counts, start_d, end_d)
+        status_df = cached(report_breakdown, start_d, end_d, "status")
+        status_counts = dict(zip(status_df["status"], status_df["Count"]))
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Tickets", int(count_df["Count"].sum()))
+        m2.metric("Open", int(status_counts.get("Open", 0)))
+        m3.metric("In Progress", int(status_counts.get("In Progress", 0)))
+        m4.metric("Resolved", int(status_counts.get("Resolved", 0)))
+        if count_df.empty:
+            st.info("No tickets in this range.")
         else:
-            today = datetime.now().date()
-            presets = {
-                "Today": (today, today),
-                "Last 7 Days": (today - timedelta(days=6), today),
-                "Last 30 Days": (today - timedelta(days=29), today),
-                "Last 6 Months": (today - timedelta(days=182), today),
-                "Last 12 Months": (today - timedelta(days=365), today)
-            }
-            sel = st.selectbox("Range", list(presets.keys()), key="report_range")
-            start_d, end_d = presets[sel]
-            df["raised_at_dt"] = pd.to_datetime(df["raised_at"])
-            mask = (df["raised_at_dt"].dt.date >= start_d) & (df["raised_at_dt"].dt.date <= end_d)
-            df_range = df.loc[mask]
-            st.metric("Tickets", len(df_range))
-            if not df_range.empty:
-                df_chart = df_range.copy()
-                df_chart["date"] = df_chart["raised_at_dt"].dt.date
-                count_df = df_chart.groupby("date").size().reset_index(name="Count")
-                st.altair_chart(alt.Chart(count_df).mark_line(point=True).encode(x="date", y="Count"), use_container_width=True)
-                st.download_button("⬇️ Download Excel", data=df_to_excel_bytes(df_range), file_name=f"Tickets_{sel}.xlsx", key="export_btn")
+            st.altair_chart(alt.Chart(count_df).mark_line(point=True).encode(x="date", y="Count"), use_container_width=True)
+            c1, c2 = st.columns(2)
+            with c1:
+                cat_df = cached(report_breakdown, start_d, end_d, "category")
+                st.altair_chart(alt.Chart(cat_df).mark_bar().encode(x="Count", y=alt.Y("category", sort="-x")), use_container_width=True)
+            with c2:
+                dept_df = cached(report_breakdown, start_d, end_d, "department")
+                st.altair_chart(alt.Chart(dept_df).mark_bar().encode(x="Count", y=alt.Y("department", sort="-x")), use_container_width=True)
+
+            st.markdown("#### ⏱️ Resolution Time (hours)")
+            res_df = cached(resolution_stats, start_d, end_d)
+            if res_df.empty:
+                st.caption("No resolved tickets in this range.")
+            else:
+                res_df["sla_target_hours"] = res_df["priority"].map(SLA_HOURS)
+                st.dataframe(res_df.round(2), use_container_width=True, hide_index=True)
+
+            # export is built only on request, streamed from the DB cursor into a temp file
+            e1, e2 = st.columns([1, 3])
+            with e1:
+                export_fmt = st.selectbox("Export Format", list(EXPORT_FORMATS.keys()), key="export_fmt")
+            ext, mime = EXPORT_FORMATS[export_fmt]
+            if st.button("📦 Prepare Export", key="export_prepare_btn"):
+                try:
+                    path = export_tickets(conn, ext, start_d, end_d)
+                    try:
+                        with open(path, "rb") as f:
+                            st.download_button(f"⬇️ Download {export_fmt}", data=f, file_name=f"Tickets_{sel}.{ext}",
+                                               mime=mime, key="export_btn")
+                    finally:
+                        os.remove(path)
+                except Exception:
+                    st.error("Export failed:")
+                    st.code(traceback.format_exc())
+
+    # Performance (rolling timings of page renders, DB calls, exports and SMTP)
+    elif page == "Performance":
+        if st.session_state.role != "IT Officer":
+            st.warning("Access denied — IT Officers only.")
+            st.stop()
+
+        import pandas as pd
+        st.subheader("⏱️ Performance")
+        st.caption(f"Percentiles over the last {METRICS.window} calls per operation · counters since "
+                   f"{METRICS.started_at:%Y-%m-%d %H:%M} · slow threshold {METRICS.slow_ms:g} ms · "
+                   f"Prometheus file `{metrics_exporter.path}` "
+                   + (f"updated {metrics_exporter.last_written:%H:%M:%S}" if metrics_exporter.last_written
+                      else "not written yet")
+                   + (f" (error: {metrics_exporter.last_error})" if metrics_exporter.last_error else ""))
+
+        rows = METRICS.snapshot()
+        areas = sorted({r["op"].split(".", 1)[0] for r in rows})
+        area = st.selectbox("Area", ["All"] + areas, key="perf_area")
+        perf_df = pd.DataFrame([r for r in rows if area == "All" or r["op"].startswith(area + ".")],
+                               columns=["op", "count", "p50_ms", "p95_ms", "p99_ms", "max_ms", "mean_ms",
+                                        "errors", "slow"])
+        if perf_df.empty:
+            st.info("No timings recorded yet.")
+        else:
+            perf_df = perf_df.sort_values("p95_ms", ascending=False).round(1)
+            st.dataframe(perf_df.rename(columns={
+                "op": "Operation", "count": "Calls", "p50_ms": "p50 (ms)", "p95_ms": "p95 (ms)",
+                "p99_ms": "p99 (ms)", "max_ms": "Max (ms)", "mean_ms": "Mean (ms)", "errors": "Errors",
+                "slow": "Slow"}), use_container_width=True, hide_index=True)
+
+        st.markdown("#### 🐢 Recent slow operations")
+        slow = METRICS.recent_slow()
+        if slow:
+            st.dataframe(pd.DataFrame(slow).rename(columns={"at": "At", "op": "Operation", "ms": "ms",
+                                                            "detail": "Parameters"}),
+                         use_container_width=True, hide_index=True)
+        else:
+            st.caption(f"Nothing slower than {METRICS.slow_ms:g} ms so far.")
+
+        c1, c2 = st.columns(2)
+        with c1:
+            cs = query_cache.stats()
+            st.markdown("#### ⚡ Query cache")
+            st.write(f"{cs['hits']} hits / {cs['misses']} misses ({cs['hit_rate']:.0%}) · "
+                     f"{cs['entries']}/{cs['max_entries']} entries · {cs['evictions']} evictions · "
+                     f"{cs['invalidations']} invalidations")
+        with c2:
+            st.markdown("#### 📧 Email outbox")
+            ob = outbox_stats(conn)
+            st.write(" · ".join(f"{k}: {v}" for k, v in sorted(ob.items())) or "empty")
+            if outbox_worker.last_error:
+                st.caption(f"⚠️ Outbox worker: {outbox_worker.last_error}")
+        st.button("Reset timings", key="perf_reset_btn", on_click=METRICS.reset)
 
     # Future Updates
     elif page == "Future Updates":
@@ -413,9 +551,6 @@ def main():
             <div style='background:#fff;border-radius:10px;padding:14px;box-shadow:0 3px 10px rgba(0,0,0,0.08);'>
                 <b>☁️ Cloud Version</b><p>Host securely on company intranet or private cloud.</p>
             </div>
-            <div style='background:#fff;border-radius:10px;padding:14px;box-shadow:0 3px 10px rgba(0,0,0,0.08);'>
-                <b>🔔 SLA Alerts</b><p>Automatic alerts for delayed or overdue tickets based on SLA rules.</p>
-            </div>
         </div>
         """, unsafe_allow_html=True)
         st.info("💡 These features are being developed by the Infinium IT Team.")
@@ -435,10 +570,29 @@ def main():
         </div>
         """, unsafe_allow_html=True)
 
+    METRICS.record(f"page.{page}", time.perf_counter() - page_started)
+
+    # Query cache stats (after the page has run its queries)
+    if st.session_state.role == "IT Officer":
+        cs = query_cache.stats()
+        st.sidebar.caption(f"⚡ Query cache: {cs['hits']} hits / {cs['misses']} misses "
+                           f"({cs['hit_rate']:.0%}) · {cs['entries']}/{cs['max_entries']} entries")
+
     # Footer
     st.markdown("---")
     st.caption("© 2025 Infinium Pharmachem Limited | Developed by Prince Prajapati (IT Officer)")
 
+    # Live dashboard: poll the change counter (one row) and rerun only once tickets changed;
+    # the rerun then merges just those rows. Widget events interrupt the wait at the next tick.
+    if page == "IT Officer Dashboard" and st.session_state.get("dash_live_updates") \
+            and not st.session_state.get("search_q", "").strip():
+        seen = change_generation(conn)
+        ticker = st.empty()
+        while change_generation(conn) == seen:
+            ticker.caption(f"🔄 Live · checked {datetime.now():%H:%M:%S}")
+            time.sleep(DASHBOARD_POLL_SECONDS)
+        st.experimental_rerun()
+
 # Safe run wrapper
 def safe_run():
     try:
@@ -0,0 +1,124 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Cold Start Benchmark
+---------------------------------------------------------------------
+Measures, each in a fresh Python process (so nothing is already imported):
+- import time of streamlit + the helpdesk modules, and which heavy
+  libraries (pandas, altair, PIL, openpyxl, smtplib...) that pulls in
+- first and second render of each page through streamlit's AppTest,
+  again with the heavy libraries loaded by the end of the first render
+With --against REF the same measurements are taken on a git revision
+(exported to a temp dir) and shown side by side, to see the gain.
+
+Usage:
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --against HEAD~1 --runs 5 --out cold_start.json
+---------------------------------------------------------------------
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = "IT_Helpdesk_Streamlit_App.py"
+HEAVY = ["pandas", "numpy", "pyarrow", "altair", "PIL", "openpyxl", "smtplib", "email.mime"]
+PAGES = [("User", "Submit Ticket"), ("IT Officer", "IT Officer Dashboard"), ("IT Officer", "Reports & Export")]
+
+IMPORT_PROBE = """
+import json, sys, time
+sys.path.insert(0, {src!r})
+t0 = time.perf_counter()
+import streamlit
+import helpdesk_db, helpdesk_mail, helpdesk_export, helpdesk_cache
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+RENDER_PROBE = """
+import json, sys, time
+sys.path.insert(0, {src!r})
+from streamlit.testing.v1 import AppTest
+def render():
+    at = AppTest.from_file({app!r}, default_timeout=120)
+    at.session_state.role = {role!r}
+    at.session_state[{nav!r}] = {page!r}
+    t0 = time.perf_counter()
+    at.run()
+    if at.exception:
+        raise SystemExit(at.exception[0].value)
+    return (time.perf_counter() - t0) * 1000
+first = render()
+loaded = [m for m in {heavy!r} if m in sys.modules]
+second = render()
+print(json.dumps({{"first_ms": first, "second_ms": second, "loaded": loaded}}))
+"""
+
+def probe(code, cwd):
+    out = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, timeout=600)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "probe failed")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def measure(src, runs):
+    """Median timings over `runs` fresh processes for the tree at `src`."""
+    result = {}
+    with tempfile.TemporaryDirectory() as cwd:  # fresh tickets.db per tree
+        samples = [probe(IMPORT_PROBE.format(src=src, heavy=HEAVY), cwd) for _ in range(runs)]
+        result["import"] = {"ms": statistics.median(s["ms"] for s in samples), "loaded": samples[-1]["loaded"]}
+        for role, page in PAGES:
+            nav = "nav_officer" if role == "IT Officer" else "nav_user"
+            code = RENDER_PROBE.format(src=src, app=os.path.join(src, APP), role=role, nav=nav, page=page,
+                                       heavy=HEAVY)
+            samples = [probe(code, cwd) for _ in range(runs)]
+            result[page] = {
+                "first_ms": statistics.median(s["first_ms"] for s in samples),
+                "second_ms": statistics.median(s["second_ms"] for s in samples),
+                "loaded": samples[-1]["loaded"],
+            }
+    return result
+
+def export_ref(ref, dest):
+    data = subprocess.run(["git", "archive", "--format=tar", ref], cwd=ROOT, capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+        tar.extractall(dest)
+
+def main():
+    ap = argparse.ArgumentParser(description="Import-time and first-render benchmark for the helpdesk app.")
+    ap.add_argument("--runs", type=int, default=3, help="fresh processes per measurement (median is reported)")
+    ap.add_argument("--against", help="git revision to compare with, e.g. HEAD~1")
+    ap.add_argument("--out", help="write results as JSON")
+    args = ap.parse_args()
+
+    trees = {"current": ROOT}
+    tmp = None
+    if args.against:
+        tmp = tempfile.TemporaryDirectory()
+        export_ref(args.against, tmp.name)
+        trees = {args.against: tmp.name, "current": ROOT}
+
+    results = {}
+    for label, src in trees.items():
+        print(f"measuring {label} ...", flush=True)
+        results[label] = measure(src, args.runs)
+    if tmp:
+        tmp.cleanup()
+
+    for section in ["import"] + [page for _, page in PAGES]:
+        print(f"\n{section}")
+        for label, res in results.items():
+            r = res[section]
+            timing = f"{r['ms']:8.1f} ms" if section == "import" else \
+                f"first {r['first_ms']:8.1f} ms   second {r['second_ms']:7.1f} ms"
+            print(f"  {label:<10} {timing}   loaded: {', '.join(r['loaded']) or '-'}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
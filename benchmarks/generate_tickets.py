@@ -0,0 +1,192 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Synthetic Ticket Generator
+---------------------------------------------------------------------
+Fills a helpdesk database with realistic tickets for benchmarking:
+- every department, category and priority from the submit form
+- raised_at spread over the last N days, ticket IDs in the usual
+  YYYY-MM-DD-NNN form, older tickets mostly resolved
+- a configurable share of tickets carrying a small PNG attachment
+  (each one unique, so the blob store grows as it would in production)
+Rows are written with executemany in chunks; ticket counters and the
+daily rollup are rebuilt once at the end.
+
+Usage:
+    python benchmarks/generate_tickets.py --rows 100000 --out benchmarks/data/tickets_100k.db
+---------------------------------------------------------------------
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpdesk_db import (
+    init_db, transaction, rebuild_ticket_counters, rebuild_daily_rollup, rebuild_resolution_stats,
+    rebuild_duplicate_index, bump_change_counter, format_ticket_id, DEPARTMENTS, CATEGORIES, PRIORITIES,
+)
+from helpdesk_attachments import make_thumbnail
+
+CHUNK_SIZE = 5000
+
+FIRST_NAMES = ["Amit", "Priya", "Rahul", "Neha", "Vikas", "Pooja", "Sanjay", "Kavita", "Ravi", "Anjali",
+               "Manish", "Sneha", "Deepak", "Komal", "Nilesh", "Heena", "Jignesh", "Rina", "Harsh", "Mitali"]
+LAST_NAMES = ["Patel", "Shah", "Mehta", "Desai", "Joshi", "Parmar", "Solanki", "Trivedi", "Rao", "Iyer"]
+OFFICERS = ["Prince Prajapati", "IT Support", "Network Admin"]
+
+ISSUES = {
+    "Network": ["Internet not working on {pc}", "VPN keeps disconnecting from {site}", "Wi-Fi very slow in {site}",
+                "Cannot reach shared drive from {pc}"],
+    "Printer": ["Printer in {site} shows paper jam", "Cannot print from {pc}", "Scanner not sending to email",
+                "Toner low on {site} printer"],
+    "Email": ["Outlook not syncing on {pc}", "Mailbox full, cannot send", "Not receiving external emails",
+              "Email signature needs update"],
+    "Software": ["{app} crashes on startup", "Need {app} installed on {pc}", "{app} license expired",
+                 "Windows update stuck on {pc}"],
+    "Hardware": ["Monitor flickering on {pc}", "Keyboard not working", "{pc} very slow, fan noise",
+                 "Laptop battery not charging"],
+    "Access": ["Reset password for {app}", "Need access to {site} shared folder", "Account locked in {app}",
+               "New joiner needs {app} login"],
+    "Other": ["Need new extension number", "Projector in {site} not detected", "CCTV footage request for {site}",
+              "General query about IT policy"],
+}
+APPS = ["SAP", "Tally", "Excel", "AutoCAD", "LIMS", "Chromeleon", "Teams", "Adobe Reader"]
+SITES = ["Plant 1", "Plant 2", "QC Lab", "Admin Block", "Warehouse", "R&D Lab", "Conference Room"]
+
+PRIORITY_WEIGHTS = [30, 45, 18, 7]   # Low, Medium, High, Critical
+MEDIAN_RESOLVE_HOURS = {"Critical": 3, "High": 6, "Medium": 20, "Low": 60}
+
+def attachment_pool(rng, count=8):
+    """A few small synthetic screenshots with their thumbnails (made unique per ticket later)."""
+    from PIL import Image, ImageDraw
+    pool = []
+    for i in range(count):
+        img = Image.new("RGB", (rng.randint(320, 800), rng.randint(240, 600)),
+                        tuple(rng.randint(180, 255) for _ in range(3)))
+        draw = ImageDraw.Draw(img)
+        for _ in range(12):
+            x, y = rng.randint(0, img.width - 40), rng.randint(0, img.height - 20)
+            draw.rectangle([x, y, x + rng.randint(20, 200), y + rng.randint(10, 60)],
+                           fill=tuple(rng.randint(0, 255) for _ in range(3)))
+        buf = io.BytesIO()
+        img.save(buf, "PNG")
+        data = buf.getvalue()
+        pool.append((data, make_thumbnail(data)))
+    return pool
+
+def _ticket(rng, day, when, seq, now):
+    category = rng.choice(CATEGORIES)
+    priority = rng.choices(PRIORITIES, PRIORITY_WEIGHTS)[0]
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    description = rng.choice(ISSUES[category]).format(
+        pc=f"PC-{rng.randint(100, 999)}", site=rng.choice(SITES), app=rng.choice(APPS))
+    age_hours = (now - when).total_seconds() / 3600
+    # lognormal resolution time around the per-priority median
+    resolve_hours = MEDIAN_RESOLVE_HOURS[priority] * rng.lognormvariate(0, 0.8)
+    status, assigned, resolved_at, notes = "Open", "", None, None
+    if resolve_hours < age_hours:
+        status, assigned = "Resolved", rng.choice(OFFICERS)
+        resolved_at = (when + timedelta(hours=resolve_hours)).isoformat()
+        notes = f"Resolved: {description.lower()}"
+    elif age_hours > 1 and rng.random() < 0.6:
+        status, assigned = "In Progress", rng.choice(OFFICERS)
+    return [format_ticket_id(day, seq), name, rng.choice(DEPARTMENTS),
+            f"{name.split()[0].lower()}@infiniumpharmachem.com", f"EMP{rng.randint(1000, 9999)}",
+            category, priority, description, None, status, assigned, when.isoformat(), resolved_at, notes]
+
+def iter_tickets(rows, days, seed, now=None):
+    """Yield ticket rows oldest first, spread over the last `days` days (weekdays busier)."""
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    start = (now - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    weights = [1.0 if (start + timedelta(days=d)).weekday() < 5 else 0.3 for d in range(days)]
+    total_weight = sum(weights)
+    produced = 0
+    for d in range(days):
+        base = start + timedelta(days=d)
+        n = rows - produced if d == days - 1 else int(round(rows * sum(weights[:d + 1]) / total_weight)) - produced
+        if d == days - 1:  # today: anywhere up to now
+            limit = (now - base).total_seconds()
+            offsets = sorted(rng.uniform(0, limit) for _ in range(n))
+        else:  # around office hours
+            offsets = sorted(rng.gauss(13 * 3600, 3 * 3600) % 86400 for _ in range(n))
+        day = base.strftime("%Y-%m-%d")
+        for seq, offset in enumerate(offsets, 1):
+            yield _ticket(rng, day, base + timedelta(seconds=offset), seq, now)
+        produced += n
+
+def generate(path, rows, attachment_share=0.05, days=365, seed=0, chunk_size=CHUNK_SIZE, progress=None):
+    """Write `rows` synthetic tickets to the database at `path`. Returns elapsed seconds."""
+    rng = random.Random(seed + 1)
+    pool = attachment_pool(rng) if attachment_share > 0 else []
+    conn = init_db(path)
+    t0 = time.perf_counter()
+    chunk = []
+
+    def flush():
+        tickets, blobs, attachments = [], [], []
+        for row in chunk:
+            if pool and rng.random() < attachment_share:
+                data, thumb = rng.choice(pool)
+                data = data + row[0].encode()  # trailing bytes after IEND keep the PNG valid but unique
+                row[8] = f"screenshot_{row[0]}.png"
+                digest = hashlib.sha256(data).hexdigest()
+                blobs.append((digest, data))
+                attachments.append((row[0], row[8], "image/png", len(data), digest, row[11], thumb, len(data)))
+            tickets.append(row + [row[12] or row[11]])  # updated_at
+        with transaction(conn):
+            conn.executemany('''INSERT INTO tickets
+                                (ticket_id, employee_name, department, contact, identification, category,
+                                 priority, description, attachment_name, status, assigned_to, raised_at,
+                                 resolved_at, resolution_notes, updated_at)
+                                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)''', tickets)
+            conn.executemany("INSERT OR IGNORE INTO attachment_blobs (sha256, data) VALUES (?,?)", blobs)
+            conn.executemany('''INSERT INTO attachments
+                                (ticket_id, name, mime, size, sha256, created_at, thumbnail, original_size)
+                                VALUES (?,?,?,?,?,?,?,?)''', attachments)
+        chunk.clear()
+
+    for done, row in enumerate(iter_tickets(rows, days, seed), 1):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            flush()
+            if progress:
+                progress(done, rows)
+    if chunk:
+        flush()
+    with transaction(conn):
+        rebuild_ticket_counters(conn)
+        rebuild_daily_rollup(conn)
+        rebuild_resolution_stats(conn)
+        rebuild_duplicate_index(conn)
+        bump_change_counter(conn)
+    conn.execute("PRAGMA optimize")
+    conn.close()
+    return time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser(description="Fill a helpdesk database with synthetic tickets.")
+    ap.add_argument("--rows", type=int, default=10000)
+    ap.add_argument("--out", required=True, help="database file to create (must not exist)")
+    ap.add_argument("--attachment-share", type=float, default=0.05, help="fraction of tickets with an attachment")
+    ap.add_argument("--days", type=int, default=365, help="spread tickets over this many days")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    if os.path.exists(args.out):
+        sys.exit(f"{args.out} already exists; refusing to add synthetic tickets to it.")
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+
+    def progress(done, total):
+        print(f"\r  {done:,}/{total:,} tickets", end="", flush=True)
+
+    elapsed = generate(args.out, args.rows, args.attachment_share, args.days, args.seed, progress=progress)
+    print(f"\r{args.rows:,} tickets written to {args.out} in {elapsed:.1f}s ({args.rows / elapsed:,.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
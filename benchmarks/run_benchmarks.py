@@ -0,0 +1,228 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Benchmark Suite
+---------------------------------------------------------------------
+Times the data-layer operations behind each page on synthetic databases
+of increasing size (see generate_tickets.py):
+- generate_ticket_id, add_ticket (with and without an attachment),
+  bulk import_tickets (1,000 rows per call)
+- fetch_tickets, update_ticket, changes_since (last 10 writes, as a
+  live dashboard polls them)
+- Reports & Export aggregation (rollup counts, breakdowns, resolution stats)
+- df_to_excel_bytes and the streaming XLSX export
+Results go to a JSON file (per size and operation: n, mean/p50/p95/min/max
+in ms) that can be compared with an earlier run to catch regressions.
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes 10000 100000
+    python benchmarks/run_benchmarks.py --sizes 1000000 --data-dir benchmarks/data
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/baseline.json
+Exits with status 1 if --compare finds an operation slower than the threshold.
+---------------------------------------------------------------------
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from helpdesk_db import (
+    init_db, generate_ticket_id, add_ticket, fetch_tickets, update_ticket, changes_since, change_generation,
+    report_daily_counts, report_breakdown, resolution_stats, DEPARTMENTS, CATEGORIES, PRIORITIES,
+)
+from helpdesk_export import df_to_excel_bytes, export_tickets
+from helpdesk_import import import_tickets
+from generate_tickets import generate, attachment_pool
+
+DEFAULT_SIZES = [10000, 100000]
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+def summarize(samples):
+    ms = [s * 1000 for s in samples]
+    return {
+        "n": len(ms),
+        "mean_ms": round(sum(ms) / len(ms), 3),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "min_ms": round(min(ms), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+def timeit(fn, repeat, setup=None):
+    """Run fn() `repeat` times (setup() untimed before each call) and return the timings."""
+    samples = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        t0 = time.perf_counter()
+        fn(arg) if setup else fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+def dataset(size, data_dir, attachment_share):
+    """Path of a generated database with `size` tickets, created on first use and reused after."""
+    path = os.path.join(data_dir, f"tickets_{size}.db")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"  generating {size:,} tickets ...", flush=True)
+        tmp = path + ".partial"
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(tmp + suffix):
+                os.remove(tmp + suffix)
+        generate(tmp, size, attachment_share)
+        os.replace(tmp, path)
+    return path
+
+def bench_size(path, workdir, repeat, excel_rows):
+    """Run every operation against a scratch copy of the database at `path`."""
+    work = os.path.join(workdir, "bench.db")
+    shutil.copyfile(path, work)
+    conn = init_db(work)
+    rng = random.Random(42)
+    results = {}
+
+    def ticket():
+        return {
+            "employee_name": "Bench User", "department": rng.choice(DEPARTMENTS), "contact": "bench@example.com",
+            "identification": "", "category": rng.choice(CATEGORIES), "priority": rng.choice(PRIORITIES),
+            "description": "benchmark ticket",
+        }
+
+    png = attachment_pool(rng, 1)[0][0]
+
+    def with_attachment():
+        data = ticket()
+        data["attachment_name"], data["attachment"] = "screenshot.png", png + os.urandom(8)
+        return data
+
+    results["generate_ticket_id"] = timeit(lambda: generate_ticket_id(conn), repeat * 10)
+    results["add_ticket"] = timeit(lambda data: add_ticket(conn, data), repeat * 2, setup=ticket)
+    results["add_ticket_attachment"] = timeit(lambda data: add_ticket(conn, data), max(repeat // 5, 3),
+                                              setup=with_attachment)
+    results["import_tickets_1000"] = timeit(lambda rows: import_tickets(conn, rows), 3,
+                                            setup=lambda: [ticket() for _ in range(1000)])
+
+    ids = [r[0] for r in conn.execute("SELECT ticket_id FROM tickets ORDER BY random() LIMIT ?", (repeat * 2,))]
+    updates = iter(ids)
+    results["update_ticket"] = timeit(
+        lambda tid: update_ticket(conn, tid, {"status": rng.choice(["In Progress", "Resolved"]),
+                                              "assigned_to": "Bench Officer", "resolution_notes": "benchmark"}),
+        len(ids), setup=lambda: next(updates))
+    results["changes_since_10"] = timeit(lambda seq: changes_since(conn, seq), repeat,
+                                         setup=lambda: change_generation(conn) - 10)
+
+    df = None
+    def fetch():
+        nonlocal df
+        df = fetch_tickets(conn)
+    results["fetch_tickets"] = timeit(fetch, max(repeat // 10, 3))
+
+    today = datetime.now().date()
+    for label, days in (("30d", 29), ("365d", 365)):
+        start_d = today - timedelta(days=days)
+
+        def reports():
+            # everything the Reports & Export page queries for one range
+            report_daily_counts(conn, start_d, today)
+            for dimension in ("status", "category", "department"):
+                report_breakdown(conn, start_d, today, dimension)
+            resolution_stats(conn, start_d, today)
+        results[f"reports_{label}"] = timeit(reports, max(repeat // 5, 3))
+
+    sample = df.head(excel_rows)
+    results["df_to_excel_bytes"] = timeit(lambda: df_to_excel_bytes(sample), 3)
+
+    def export_30d():
+        os.remove(export_tickets(conn, "xlsx", today - timedelta(days=29), today, directory=workdir))
+    results["export_xlsx_30d"] = timeit(export_30d, 3)
+
+    tickets = conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+    conn.close()
+    return tickets, {op: summarize(samples) for op, samples in results.items()}
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+def compare(current, baseline, threshold, min_ms):
+    """Return a list of (size, op, before, after) whose p50 grew by more than `threshold`x."""
+    regressions = []
+    for size, entry in current["sizes"].items():
+        before_ops = baseline.get("sizes", {}).get(size, {}).get("ops", {})
+        for op, stats in entry["ops"].items():
+            before = before_ops.get(op)
+            if before and stats["p50_ms"] > max(before["p50_ms"] * threshold, min_ms):
+                regressions.append((size, op, before["p50_ms"], stats["p50_ms"]))
+    return regressions
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the helpdesk data layer on synthetic databases.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="ticket counts, e.g. 10000 100000 1000000")
+    ap.add_argument("--repeat", type=int, default=50, help="base repetitions per operation")
+    ap.add_argument("--attachment-share", type=float, default=0.05)
+    ap.add_argument("--excel-rows", type=int, default=10000, help="rows passed to df_to_excel_bytes")
+    ap.add_argument("--data-dir", default=os.path.join(ROOT, "benchmarks", "data"),
+                    help="where generated databases are kept between runs")
+    ap.add_argument("--out", help="results file (default: benchmarks/results/bench-<timestamp>.json)")
+    ap.add_argument("--compare", help="earlier results file to compare against")
+    ap.add_argument("--threshold", type=float, default=1.25, help="allowed p50 slowdown factor")
+    ap.add_argument("--min-ms", type=float, default=1.0, help="ignore regressions below this many ms")
+    args = ap.parse_args()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "attachment_share": args.attachment_share,
+            "excel_rows": args.excel_rows,
+        },
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            print(f"{size:,} tickets", flush=True)
+            tickets, ops = bench_size(dataset(size, args.data_dir, args.attachment_share), workdir,
+                                      args.repeat, args.excel_rows)
+            report["sizes"][str(size)] = {"tickets": tickets, "ops": ops}
+            for op, s in ops.items():
+                print(f"  {op:<26} p50 {s['p50_ms']:10.2f} ms   p95 {s['p95_ms']:10.2f} ms   (n={s['n']})")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_ms)
+        for size, op, before, after in regressions:
+            print(f"  REGRESSION {op} @ {int(size):,}: p50 {before:.2f} ms -> {after:.2f} ms")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.threshold:g}x against {args.compare}")
+
+if __name__ == "__main__":
+    main()
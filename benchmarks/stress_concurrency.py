@@ -0,0 +1,152 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Concurrency Stress Test
+---------------------------------------------------------------------
+Runs N submitter threads (add_ticket) and M officer threads (paged reads +
+update_ticket) against one Database in a scratch file, then checks:
+- every submitted ticket exists, with a unique ticket ID
+- every officer's last update to each of its tickets is what the DB holds
+- the daily rollup and change counter agree with the writes performed
+- p95 / max latency per operation stay under the given bounds
+
+Usage:
+    python benchmarks/stress_concurrency.py --submitters 8 --officers 4 --ops 200
+Exits with status 1 if any check fails.
+---------------------------------------------------------------------
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpdesk_db import (
+    Database, add_ticket, update_ticket, query_tickets, get_ticket, change_generation, CATEGORIES, PRIORITIES,
+)
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+def run(submitters, officers, ops, seed_tickets, path):
+    database = Database(path)
+    latencies = {"add_ticket": [], "update_ticket": [], "query_tickets": []}
+    lat_lock = threading.Lock()
+    errors = []
+    submitted = []
+    expected_notes = {}
+
+    def timed(name, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        result = fn(*args, **kwargs)
+        with lat_lock:
+            latencies[name].append(time.perf_counter() - t0)
+        return result
+
+    def new_ticket(rng, who):
+        return {
+            "employee_name": who, "department": "QA", "contact": "", "identification": "",
+            "category": rng.choice(CATEGORIES), "priority": rng.choice(PRIORITIES),
+            "description": f"stress ticket from {who}",
+        }
+
+    # officers each own a disjoint slice of pre-seeded tickets, so the final state is known
+    rng = random.Random(0)
+    seeded = [add_ticket(database.writer, new_ticket(rng, "seed")) for _ in range(seed_tickets)]
+    slices = [seeded[i::officers] for i in range(officers)] if officers else []
+
+    def submitter(n):
+        rng = random.Random(n)
+        try:
+            for _ in range(ops):
+                tid = timed("add_ticket", add_ticket, database.writer, new_ticket(rng, f"user{n}"))
+                with lat_lock:
+                    submitted.append(tid)
+        except Exception as e:
+            errors.append(f"submitter {n}: {e!r}")
+
+    def officer(n):
+        rng = random.Random(1000 + n)
+        mine = slices[n]
+        reader = database.reader()
+        try:
+            for i in range(ops):
+                timed("query_tickets", query_tickets, reader, {"status": ["Open", "In Progress"]}, limit=25)
+                tid = rng.choice(mine)
+                notes = f"officer{n}-update{i}"
+                status = rng.choice(["Open", "In Progress", "Resolved"])
+                timed("update_ticket", update_ticket, database.writer, tid,
+                      {"status": status, "assigned_to": f"officer{n}", "resolution_notes": notes})
+                expected_notes[tid] = (status, notes)
+        except Exception as e:
+            errors.append(f"officer {n}: {e!r}")
+
+    threads = [threading.Thread(target=submitter, args=(n,)) for n in range(submitters)]
+    threads += [threading.Thread(target=officer, args=(n,)) for n in range(officers)]
+    gen_before = change_generation(database.writer)
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    # verification
+    reader = database.reader()
+    total = reader.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+    distinct = reader.execute("SELECT COUNT(DISTINCT ticket_id) FROM tickets").fetchone()[0]
+    rollup = reader.execute("SELECT COALESCE(SUM(count), 0) FROM ticket_daily_stats").fetchone()[0]
+    checks = {
+        "no errors": not errors,
+        "all submissions stored": len(submitted) == submitters * ops
+                                  and total == seed_tickets + submitters * ops,
+        "ticket ids unique": distinct == total and len(set(submitted)) == len(submitted),
+        "no lost updates": all(
+            (t := get_ticket(reader, tid)) and (t["status"], t["resolution_notes"]) == want
+            for tid, want in expected_notes.items()),
+        "rollup matches tickets": rollup == total,
+        "change counter matches writes": change_generation(reader) - gen_before == (submitters + officers) * ops,
+    }
+    stats = {name: (percentile(v, 50), percentile(v, 95), max(v) if v else 0.0) for name, v in latencies.items()}
+    database.close()
+    return checks, stats, errors, elapsed
+
+def main():
+    ap = argparse.ArgumentParser(description="Concurrent submit/update stress test for the helpdesk database.")
+    ap.add_argument("--submitters", type=int, default=8)
+    ap.add_argument("--officers", type=int, default=4)
+    ap.add_argument("--ops", type=int, default=200, help="operations per thread")
+    ap.add_argument("--seed-tickets", type=int, default=200)
+    ap.add_argument("--max-p95-ms", type=float, default=250.0)
+    ap.add_argument("--max-ms", type=float, default=5000.0)
+    ap.add_argument("--db", help="database file (default: a temp file, removed afterwards)")
+    args = ap.parse_args()
+
+    tmpdir = None
+    path = args.db
+    if not path:
+        tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmpdir.name, "stress.db")
+    checks, stats, errors, elapsed = run(args.submitters, args.officers, args.ops, args.seed_tickets, path)
+
+    print(f"{args.submitters} submitters, {args.officers} officers, {args.ops} ops each in {elapsed:.2f}s")
+    for name, (p50, p95, mx) in stats.items():
+        ok = p95 * 1000 <= args.max_p95_ms and mx * 1000 <= args.max_ms
+        checks[f"{name} latency bounded"] = ok
+        print(f"  {name:<14} p50 {p50 * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms   max {mx * 1000:8.2f} ms")
+    for err in errors[:10]:
+        print("  error:", err)
+    for name, ok in checks.items():
+        print(f"  [{'PASS' if ok else 'FAIL'}] {name}")
+    if tmpdir:
+        tmpdir.cleanup()
+    sys.exit(0 if all(checks.values()) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Archival (hot/cold)
+---------------------------------------------------------------------
+Moves tickets resolved more than N months ago, with their attachments,
+from the live database into <db>_archive.db:
+- batches of ARCHIVE_BATCH_SIZE tickets; each batch is first copied
+  (INSERT OR IGNORE, so an interrupted run can simply be repeated) and
+  then deleted from the live tables in a second transaction, but only
+  once every ticket and attachment is confirmed in the archive under the
+  same id and ticket ID - otherwise the batch is aborted (ArchiveMismatch)
+- the daily rollup and ticket counters stay in the live database, so
+  report counts and new ticket IDs are unaffected
+- compact(): checkpoint + VACUUM to give the freed pages back to the OS
+Search, Reports & Export and get_ticket() read the archive through
+ATTACH (see helpdesk_db.attach_archive); the dashboard list does not.
+
+Usage:
+    python helpdesk_archive.py [--db tickets.db] [--months 12] [--vacuum] [--dry-run]
+---------------------------------------------------------------------
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+
+from helpdesk_db import (
+    DB_PATH, TICKET_COLUMNS, init_db, transaction, attach_archive, bump_change_counter,
+)
+from helpdesk_metrics import instrumented
+
+load_dotenv()
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "12") or 12)
+ARCHIVE_BATCH_SIZE = 1000
+
+class ArchiveMismatch(RuntimeError):
+    """The archive already holds different rows under the ids of a batch; nothing was deleted."""
+
+ATTACHMENT_COLUMNS = ["id", "ticket_id", "name", "mime", "size", "sha256", "created_at", "thumbnail",
+                      "original_size"]
+
+def ensure_archive(conn):
+    """Attach (creating if needed) the archive file and make sure its schema exists."""
+    if not attach_archive(conn, create=True):
+        raise RuntimeError("Cannot open the archive database (no file path, or inside a transaction).")
+    conn.execute("PRAGMA archive.journal_mode = WAL")
+    with transaction(conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS archive.tickets (
+                id INTEGER PRIMARY KEY,
+                ticket_id TEXT,
+                employee_name TEXT,
+                department TEXT,
+                contact TEXT,
+                identification TEXT,
+                category TEXT,
+                priority TEXT,
+                description TEXT,
+                attachment_name TEXT,
+                status TEXT,
+                assigned_to TEXT,
+                raised_at TEXT,
+                resolved_at TEXT,
+                resolution_notes TEXT
+            )
+        """)
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS archive.idx_tickets_ticket_id ON tickets(ticket_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_tickets_raised_at ON tickets(raised_at)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS archive.attachment_blobs (
+                sha256 TEXT PRIMARY KEY,
+                data BLOB NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS archive.attachments (
+                id INTEGER PRIMARY KEY,
+                ticket_id TEXT NOT NULL,
+                name TEXT,
+                mime TEXT,
+                size INTEGER,
+                sha256 TEXT NOT NULL,
+                created_at TEXT,
+                thumbnail BLOB,
+                original_size INTEGER
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_attachments_ticket ON attachments(ticket_id)")
+        # same full-text index as the live table; archived rows are only ever inserted
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS archive.tickets_fts USING fts5(
+                description, resolution_notes, employee_name, category,
+                content='tickets', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS archive.tickets_fts_ai AFTER INSERT ON tickets BEGIN
+                INSERT INTO tickets_fts (rowid, description, resolution_notes, employee_name, category)
+                VALUES (new.id, new.description, new.resolution_notes, new.employee_name, new.category);
+            END
+        """)
+
+def months_ago(now, months):
+    month = now.month - 1 - months
+    year, month = now.year + month // 12, month % 12 + 1
+    return now.replace(year=year, month=month, day=min(now.day, 28))
+
+def _due(conn, cutoff, limit):
+    return [r[0] for r in conn.execute("""
+        SELECT id FROM main.tickets
+        WHERE status = 'Resolved' AND COALESCE(resolved_at, raised_at) < ?
+        ORDER BY id LIMIT ?
+    """, (cutoff, limit))]
+
+def _unconfirmed(conn, ids, in_batch, marks):
+    """Ticket IDs of the batch whose ticket or attachments are not in the archive under the same ids."""
+    missing = [r[0] for r in conn.execute(f"""
+        SELECT m.ticket_id FROM main.tickets m
+        WHERE m.id IN ({marks})
+          AND NOT EXISTS (SELECT 1 FROM archive.tickets a WHERE a.id = m.id AND a.ticket_id IS m.ticket_id)
+    """, ids)]
+    missing += [r[0] for r in conn.execute(f"""
+        SELECT DISTINCT m.ticket_id FROM main.attachments m
+        WHERE m.ticket_id IN ({in_batch})
+          AND NOT EXISTS (SELECT 1 FROM archive.attachments a
+                          WHERE a.id = m.id AND a.ticket_id = m.ticket_id AND a.sha256 = m.sha256)
+    """, ids)]
+    return missing
+
+def _move_batch(conn, ids):
+    """Copy one batch to the archive, then remove it from the live tables. Returns attachments moved."""
+    marks = ",".join("?" * len(ids))
+    in_batch = f"SELECT ticket_id FROM main.tickets WHERE id IN ({marks})"
+    cols = ", ".join(TICKET_COLUMNS)
+    att_cols = ", ".join(ATTACHMENT_COLUMNS)
+    # 1) copy; committed on its own so a crash before step 2 leaves the tickets in both stores,
+    #    and the next run skips the copies and finishes the delete
+    with transaction(conn):
+        conn.execute(f"INSERT OR IGNORE INTO archive.tickets ({cols}) SELECT {cols} FROM main.tickets "
+                     f"WHERE id IN ({marks})", ids)
+        conn.execute(f"""
+            INSERT OR IGNORE INTO archive.attachment_blobs (sha256, data)
+            SELECT sha256, data FROM main.attachment_blobs
+            WHERE sha256 IN (SELECT sha256 FROM main.attachments WHERE ticket_id IN ({in_batch}))
+        """, ids)
+        moved = conn.execute(f"INSERT OR IGNORE INTO archive.attachments ({att_cols}) SELECT {att_cols} "
+                             f"FROM main.attachments WHERE ticket_id IN ({in_batch})", ids).rowcount
+    # 2) drop from the hot store (FTS rows go with the delete trigger); open dashboards
+    #    learn about it from ticket_removals. A copy skipped by INSERT OR IGNORE because the
+    #    archive holds another ticket under that id or ticket ID (e.g. after a restore from
+    #    backup) must not be deleted here, so the whole batch is checked first.
+    with transaction(conn):
+        missing = _unconfirmed(conn, ids, in_batch, marks)
+        if missing:
+            raise ArchiveMismatch(f"{len(missing)} tickets of this batch differ from the archive copy under the "
+                                  f"same id (e.g. {', '.join(sorted(map(str, missing))[:5])}); batch not deleted.")
+        seq = bump_change_counter(conn)
+        conn.execute(f"INSERT OR REPLACE INTO main.ticket_removals (ticket_id, change_seq) "
+                     f"SELECT ticket_id, ? FROM main.tickets WHERE id IN ({marks})", [seq] + ids)
+        digests = [r[0] for r in conn.execute(
+            f"SELECT DISTINCT sha256 FROM main.attachments WHERE ticket_id IN ({in_batch})", ids)]
+        conn.execute(f"DELETE FROM main.attachments WHERE ticket_id IN ({in_batch})", ids)
+        conn.execute(f"DELETE FROM main.ticket_lsh WHERE ticket_id IN ({in_batch})", ids)
+        conn.execute(f"DELETE FROM main.tickets WHERE id IN ({marks})", ids)
+        for i in range(0, len(digests), 500):
+            chunk = digests[i:i + 500]
+            conn.execute(f"""
+                DELETE FROM main.attachment_blobs
+                WHERE sha256 IN ({','.join('?' * len(chunk))})
+                  AND NOT EXISTS (SELECT 1 FROM main.attachments a WHERE a.sha256 = attachment_blobs.sha256)
+            """, chunk)
+    return moved
+
+@instrumented("archive")
+def archive_resolved(conn, months=ARCHIVE_AFTER_MONTHS, batch_size=ARCHIVE_BATCH_SIZE, now=None,
+                     dry_run=False, progress=None):
+    """
+    Move tickets resolved more than `months` months ago to the archive.
+    Returns a dict with cutoff, tickets, attachments, batches and seconds.
+    """
+    t0 = time.perf_counter()
+    cutoff = months_ago(now or datetime.now(), months).isoformat()
+    result = {"cutoff": cutoff, "tickets": 0, "attachments": 0, "batches": 0}
+    if dry_run:
+        result["tickets"] = conn.execute("""
+            SELECT COUNT(*) FROM main.tickets
+            WHERE status = 'Resolved' AND COALESCE(resolved_at, raised_at) < ?
+        """, (cutoff,)).fetchone()[0]
+    else:
+        ensure_archive(conn)
+        while True:
+            ids = _due(conn, cutoff, batch_size)
+            if not ids:
+                break
+            result["attachments"] += _move_batch(conn, ids)
+            result["tickets"] += len(ids)
+            result["batches"] += 1
+            if progress:
+                progress(result)
+    result["seconds"] = time.perf_counter() - t0
+    return result
+
+def _file_size(path):
+    return sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+
+@instrumented("archive")
+def compact(conn, path):
+    """
+    Checkpoint the WAL and VACUUM the live database to return freed pages to the OS.
+    Needs a moment of exclusive access; returns (bytes before, bytes after).
+    """
+    before = _file_size(path)
+    with conn.write_lock:
+        conn.execute("PRAGMA main.wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM main")
+        conn.execute("PRAGMA main.wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA optimize")
+    return before, _file_size(path)
+
+def main():
+    ap = argparse.ArgumentParser(description="Move old resolved tickets into the archive database.")
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--months", type=int, default=ARCHIVE_AFTER_MONTHS,
+                    help="archive tickets resolved more than this many months ago")
+    ap.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    ap.add_argument("--vacuum", action="store_true", help="compact the live database afterwards")
+    ap.add_argument("--dry-run", action="store_true", help="only count what would be archived")
+    args = ap.parse_args()
+
+    def progress(r):
+        print(f"\r  {r['tickets']:,} tickets archived", end="", flush=True)
+
+    conn = init_db(args.db)
+    try:
+        result = archive_resolved(conn, args.months, args.batch_size, dry_run=args.dry_run, progress=progress)
+        verb = "would be archived" if args.dry_run else f"archived to {conn.archive_path}"
+        print(f"\r{result['tickets']:,} tickets resolved before {result['cutoff'][:10]} {verb} "
+              f"({result['attachments']:,} attachments, {result['seconds']:.1f}s)")
+        if args.vacuum and not args.dry_run:
+            before, after = compact(conn, args.db)
+            print(f"compacted {args.db}: {before / 1048576:.1f} MB -> {after / 1048576:.1f} MB")
+    except ArchiveMismatch as e:
+        raise SystemExit(f"\narchiving stopped: {e}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
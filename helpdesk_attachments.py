@@ -0,0 +1,102 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Attachment Ingestion
+---------------------------------------------------------------------
+Runs once when a ticket is submitted, before the bytes are stored:
+- enforce size limits (ATTACHMENT_MAX_MB)
+- images: apply EXIF orientation, drop EXIF/metadata, downscale anything
+  larger than IMAGE_MAX_DIMENSION and recompress
+- images: build a small JPEG thumbnail for the dashboard preview
+Non-image files (PDF, logs, spreadsheets) are only size-checked.
+---------------------------------------------------------------------
+"""
+
+import io
+import os
+from dotenv import load_dotenv
+
+from helpdesk_metrics import instrumented
+
+load_dotenv()
+ATTACHMENT_MAX_MB = float(os.getenv("ATTACHMENT_MAX_MB", "10") or 10)
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "2560") or 2560)
+IMAGE_RECOMPRESS_KB = int(os.getenv("IMAGE_RECOMPRESS_KB", "1024") or 1024)
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "320") or 320)
+JPEG_QUALITY = 85
+THUMBNAIL_QUALITY = 75
+
+IMAGE_FORMATS = {"image/png": "PNG", "image/jpeg": "JPEG"}
+
+class AttachmentRejected(ValueError):
+    """The uploaded file breaks an attachment limit; the message is shown to the user."""
+
+def _to_rgb(img):
+    from PIL import Image
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        return background
+    return img.convert("RGB") if img.mode != "RGB" else img
+
+@instrumented("image")
+def make_thumbnail(data, size=THUMBNAIL_SIZE):
+    """JPEG thumbnail bytes (longest side <= size) for image bytes, or None if not decodable."""
+    from PIL import Image, ImageOps
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.draft("RGB", (size, size))  # JPEG: decode at reduced scale
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((size, size))
+            out = io.BytesIO()
+            _to_rgb(img).save(out, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+            return out.getvalue()
+    except Exception:
+        return None
+
+def _process_image(data, fmt):
+    """
+    Re-encode without metadata when the image carries EXIF, is larger than
+    IMAGE_MAX_DIMENSION or heavier than IMAGE_RECOMPRESS_KB.
+    Returns new bytes, or None to keep the original as-is.
+    """
+    from PIL import Image, ImageOps
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            has_metadata = bool(img.info.get("exif")) or bool(img.getexif())
+            oversized = max(img.size) > IMAGE_MAX_DIMENSION
+            heavy = len(data) > IMAGE_RECOMPRESS_KB * 1024
+            if not (has_metadata or oversized or heavy):
+                return None
+            img = ImageOps.exif_transpose(img)
+            if oversized:
+                img.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION))
+            out = io.BytesIO()
+            if fmt == "JPEG":
+                _to_rgb(img).save(out, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+            else:
+                img.save(out, "PNG", optimize=True)
+            if not (has_metadata or oversized) and out.tell() >= len(data):
+                return None  # recompression did not help
+            return out.getvalue()
+    except Exception:
+        return None
+
+@instrumented("image")
+def prepare_attachment(name, data, mime):
+    """
+    Validate and normalise an upload. Returns a dict with data, mime, original_size and
+    thumbnail (None for non-images). Raises AttachmentRejected when over the size limit.
+    """
+    limit = int(ATTACHMENT_MAX_MB * 1024 * 1024)
+    original_size = len(data)
+    if original_size > limit:
+        raise AttachmentRejected(
+            f"Attachment '{name}' is {original_size / 1048576:.1f} MB; the limit is {ATTACHMENT_MAX_MB:g} MB.")
+    result = {"data": data, "mime": mime, "original_size": original_size, "thumbnail": None}
+    fmt = IMAGE_FORMATS.get(mime)
+    if fmt:
+        processed = _process_image(data, fmt)
+        if processed is not None:
+            result["data"] = processed
+        result["thumbnail"] = make_thumbnail(result["data"])
+    return result
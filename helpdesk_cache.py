@@ -0,0 +1,96 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Query Cache
+---------------------------------------------------------------------
+Process-wide LRU cache for read queries, shared by every Streamlit
+session. Entries are keyed by the query function and its parameters and
+are dropped as soon as the tickets change counter moves (bumped by
+add_ticket()/update_ticket() in the same transaction as the write).
+---------------------------------------------------------------------
+"""
+
+import threading
+from collections import OrderedDict
+
+from helpdesk_db import change_generation
+
+QUERY_CACHE_SIZE = 256
+
+def _freeze(value):
+    """Make query parameters hashable (dicts/lists/sets -> sorted tuples)."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, set):
+        return tuple(sorted(_freeze(v) for v in value))
+    return value
+
+class QueryCache:
+    """
+    Bounded LRU of query results. Results are invalidated wholesale when the database
+    change generation differs from the one the entries were computed at.
+    DataFrame results are copied on the way out so callers may modify them.
+    """
+
+    def __init__(self, max_entries=QUERY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generation = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def call(self, conn, fn, *args, **kwargs):
+        """Return fn(conn, *args, **kwargs), served from cache while the data is unchanged."""
+        generation = change_generation(conn)
+        key = (fn.__module__, fn.__qualname__, _freeze(args), _freeze(kwargs))
+        with self._lock:
+            if self._generation is None or generation > self._generation:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._generation = generation
+            if generation == self._generation and key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy(self._entries[key])
+            # miss (or this reader's snapshot predates a newer write: bypass the cache)
+            self.misses += 1
+        result = fn(conn, *args, **kwargs)
+        with self._lock:
+            # a write may have landed while we were computing; only keep fresh results
+            if generation == self._generation:
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return _copy(result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation = None
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "generation": self._generation,
+            }
+
+def _copy(result):
+    if isinstance(result, tuple):
+        return tuple(_copy(r) for r in result)
+    if hasattr(result, "columns") and hasattr(result, "copy"):  # DataFrame
+        return result.copy()
+    return result
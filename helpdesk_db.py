@@ -0,0 +1,1127 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Database Layer
+---------------------------------------------------------------------
+Ticket storage shared by the Streamlit app and headless tools:
+- tickets table (metadata only, no binary columns)
+- content-addressed attachment store (attachment_blobs + attachments)
+- Database: WAL mode, one read connection per thread and a single
+  lock-serialized writer connection
+- cold store: old resolved tickets live in <db>_archive.db, ATTACHed
+  as "archive" only by the queries that span both (search, reports,
+  export); the dashboard list reads the hot tables only
+- near-duplicate index: LSH buckets of open tickets (ticket_lsh, see
+  helpdesk_similarity), kept in step by add_ticket()/update_ticket()
+---------------------------------------------------------------------
+"""
+
+import html
+import logging
+import os
+import re
+import sqlite3
+import threading
+import hashlib
+import mimetypes
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime, timedelta
+from itertools import groupby
+
+from helpdesk_attachments import prepare_attachment, make_thumbnail
+from helpdesk_metrics import instrumented
+from helpdesk_similarity import DUPLICATE_THRESHOLD, duplicate_keys, shingles, jaccard
+
+DB_PATH = "tickets.db"
+BUSY_TIMEOUT_SECONDS = 10
+
+# Columns returned by list queries (never the attachment bytes)
+TICKET_COLUMNS = [
+    "id", "ticket_id", "employee_name", "department", "contact", "identification",
+    "category", "priority", "description", "attachment_name", "status", "assigned_to",
+    "raised_at", "resolved_at", "resolution_notes"
+]
+
+# Form choices (the UI prepends "Select...")
+DEPARTMENTS = [
+    "Accounts","HR","Purchase","CA/CS/CFO","Import/Export","Sales","DEO",
+    "Production","Admin & Logistics","QA","QC","Micro","R&D","Engineering","Manufacturing"
+]
+CATEGORIES = ["Network","Printer","Email","Software","Hardware","Access","Other"]
+PRIORITIES = ["Low", "Medium", "High", "Critical"]
+STATUSES = ["Open", "In Progress", "Resolved"]
+
+BLOB_CHUNK_SIZE = 64 * 1024
+
+# Daily rollup dimensions (ticket_daily_stats is keyed by raised day + these)
+ROLLUP_DIMENSIONS = ["status", "category", "priority", "department"]
+
+# Resolution targets in hours, per priority
+SLA_HOURS = {"Critical": 4, "High": 8, "Medium": 24, "Low": 72}
+
+# Connections
+class HelpdeskConnection(sqlite3.Connection):
+    """sqlite3 connection carrying the lock that serializes transaction() blocks on it."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.write_lock = threading.RLock()
+        self.archive_path = None
+        self.archive_attached = False
+
+def archive_path_for(path):
+    """Cold-store file next to the live database: tickets.db -> tickets_archive.db."""
+    if not path or path == ":memory:" or path.startswith("file:"):
+        return None
+    root, ext = os.path.splitext(path)
+    return f"{root}_archive{ext or '.db'}"
+
+def connect(path=DB_PATH, readonly=False, busy_timeout=BUSY_TIMEOUT_SECONDS, archive_path=None):
+    conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False, factory=HelpdeskConnection)
+    conn.archive_path = archive_path or archive_path_for(path)
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+    if readonly:
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        # WAL lets readers run while a write is in progress; NORMAL sync is safe in WAL mode
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+# Database init
+def init_db(path=DB_PATH, archive_path=None):
+    """Open a writer connection and bring the schema up to date."""
+    conn = connect(path, archive_path=archive_path)
+    migrate(conn)
+    return conn
+
+class Database:
+    """
+    Data-access entry point for multi-threaded callers (Streamlit sessions, workers):
+    - reader(): this thread's own query-only connection
+    - writer: the single write connection; every transaction() on it holds its lock,
+      so writes from all threads are applied one at a time
+    """
+
+    def __init__(self, path=DB_PATH, busy_timeout=BUSY_TIMEOUT_SECONDS, archive_path=None):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.archive_path = archive_path
+        self.writer = init_db(path, archive_path)
+        self._local = threading.local()
+
+    def reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path, readonly=True, busy_timeout=self.busy_timeout,
+                           archive_path=self.archive_path)
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        self.writer.close()
+
+@contextmanager
+def transaction(conn):
+    """
+    Run the block as one write transaction (BEGIN IMMEDIATE ... COMMIT, rollback on error).
+    Holds the connection's write lock, so threads sharing a writer take turns.
+    Nested use on the same thread joins the outer transaction.
+    """
+    with getattr(conn, "write_lock", None) or nullcontext():
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+def attach_archive(conn, create=False):
+    """
+    ATTACH the cold store as schema "archive" the first time a query needs it.
+    Returns False while no archive exists (create=True makes the file), or when called
+    inside a transaction before it was attached (SQLite cannot ATTACH there).
+    """
+    if conn.archive_attached:
+        return True
+    path = getattr(conn, "archive_path", None)
+    if not path or not (create or os.path.exists(path)) or conn.in_transaction:
+        return False
+    with getattr(conn, "write_lock", None) or nullcontext():
+        if conn.archive_attached:
+            return True
+        conn.execute("ATTACH DATABASE ? AS archive", (path,))
+        if not create and not conn.execute(
+                "SELECT 1 FROM archive.sqlite_master WHERE type='table' AND name='tickets'").fetchone():
+            conn.execute("DETACH DATABASE archive")  # file exists but the archiver has not set it up yet
+            return False
+        conn.archive_attached = True
+    return True
+
+def ticket_stores(conn):
+    """Schemas holding tickets: ["main"], plus "archive" once archived tickets exist."""
+    return ["main", "archive"] if attach_archive(conn) else ["main"]
+
+def _table_columns(conn, table):
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+
+# Schema migrations (tracked in PRAGMA user_version; each step runs in one transaction)
+def _m001_base_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tickets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticket_id TEXT,
+            employee_name TEXT,
+            department TEXT,
+            contact TEXT,
+            identification TEXT,
+            category TEXT,
+            priority TEXT,
+            description TEXT,
+            attachment_name TEXT,
+            status TEXT,
+            assigned_to TEXT,
+            raised_at TEXT,
+            resolved_at TEXT,
+            resolution_notes TEXT
+        )
+    """)
+    # bytes are stored once per sha256; tickets reference them through attachments
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS attachment_blobs (
+            sha256 TEXT PRIMARY KEY,
+            data BLOB NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS attachments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticket_id TEXT NOT NULL,
+            name TEXT,
+            mime TEXT,
+            size INTEGER,
+            sha256 TEXT NOT NULL REFERENCES attachment_blobs(sha256),
+            created_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_attachments_ticket ON attachments(ticket_id)")
+    migrate_inline_attachments(conn)
+
+def _m002_indexes_and_counters(conn):
+    _renumber_duplicate_ticket_ids(conn)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_tickets_ticket_id ON tickets(ticket_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_raised_at ON tickets(raised_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets(status)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_priority ON tickets(priority)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ticket_counters (
+            day TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL
+        )
+    """)
+    rebuild_ticket_counters(conn)
+
+def _renumber_duplicate_ticket_ids(conn):
+    """
+    Legacy IDs were derived from a row count, so two tickets could share one. The oldest row keeps
+    the ID; later rows (and their attachments) move to the next free sequence number of the same
+    day, so the unique index can be built. Returns [(row id, old ID, new ID)].
+    """
+    log = logging.getLogger("helpdesk.migrations")
+    renamed = []
+    dups = [r[0] for r in conn.execute(
+        "SELECT ticket_id FROM tickets WHERE ticket_id IS NOT NULL GROUP BY ticket_id HAVING COUNT(*) > 1")]
+    for old in dups:
+        rows = conn.execute("SELECT id, raised_at, attachment_name FROM tickets WHERE ticket_id=? ORDER BY id",
+                            (old,)).fetchall()
+        day = old[:10] if re.match(r"\d{4}-\d{2}-\d{2}-", old) else (rows[0][1] or "")[:10]
+        seq = conn.execute("SELECT MAX(CAST(substr(ticket_id, 12) AS INTEGER)) FROM tickets WHERE ticket_id LIKE ?",
+                           (f"{day}-%",)).fetchone()[0] or 0
+        moves = []
+        for row in rows[1:]:
+            new = old
+            while new == old or conn.execute("SELECT 1 FROM tickets WHERE ticket_id=?", (new,)).fetchone():
+                seq += 1
+                new = format_ticket_id(day, seq) if day else f"{old}-{seq}"
+            moves.append((row, new))
+        # latest first: inline attachments were moved in row order, so when two rows match
+        # the same attachment name and time the later row owns the later attachment
+        for (row_id, raised_at, attachment_name), new in reversed(moves):
+            conn.execute("UPDATE tickets SET ticket_id=? WHERE id=?", (new, row_id))
+            if attachment_name:
+                conn.execute("""
+                    UPDATE attachments SET ticket_id=?
+                    WHERE id = (SELECT MAX(id) FROM attachments WHERE ticket_id=? AND name=? AND created_at IS ?)
+                """, (new, old, attachment_name, raised_at))
+            log.warning("Ticket %s (row %s) shares its ID with an older ticket; renumbered to %s", old, row_id, new)
+            renamed.append((row_id, old, new))
+    return renamed
+
+def rebuild_ticket_counters(conn):
+    """Seed ticket_counters from history: max of the per-day count and the largest YYYY-MM-DD-NNN suffix."""
+    conn.execute("""
+        INSERT OR REPLACE INTO ticket_counters (day, last_seq)
+        SELECT substr(raised_at, 1, 10),
+               MAX(COUNT(*), MAX(CASE WHEN ticket_id LIKE substr(raised_at, 1, 10) || '-%'
+                                      THEN CAST(substr(ticket_id, 12) AS INTEGER) ELSE 0 END))
+        FROM tickets
+        WHERE raised_at IS NOT NULL
+        GROUP BY substr(raised_at, 1, 10)
+    """)
+
+def _m003_email_outbox(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticket_id TEXT,
+            subject TEXT NOT NULL,
+            to_addrs TEXT NOT NULL,
+            cc_addrs TEXT,
+            body_html TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TEXT NOT NULL,
+            claimed_at TEXT,
+            claim_token TEXT,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            sent_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON email_outbox(status, next_attempt_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_ticket ON email_outbox(ticket_id)")
+
+def _m004_dashboard_indexes(conn):
+    # dashboard filters + keyset order (raised_at DESC, id DESC)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_status_raised ON tickets(status, raised_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_department ON tickets(department, raised_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_assigned ON tickets(assigned_to, raised_at)")
+
+def _m005_fulltext_search(conn):
+    # external-content FTS5 index over tickets, kept in sync by triggers
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts USING fts5(
+            description, resolution_notes, employee_name, category,
+            content='tickets', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS tickets_fts_ai AFTER INSERT ON tickets BEGIN
+            INSERT INTO tickets_fts (rowid, description, resolution_notes, employee_name, category)
+            VALUES (new.id, new.description, new.resolution_notes, new.employee_name, new.category);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS tickets_fts_ad AFTER DELETE ON tickets BEGIN
+            INSERT INTO tickets_fts (tickets_fts, rowid, description, resolution_notes, employee_name, category)
+            VALUES ('delete', old.id, old.description, old.resolution_notes, old.employee_name, old.category);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS tickets_fts_au
+        AFTER UPDATE OF description, resolution_notes, employee_name, category ON tickets BEGIN
+            INSERT INTO tickets_fts (tickets_fts, rowid, description, resolution_notes, employee_name, category)
+            VALUES ('delete', old.id, old.description, old.resolution_notes, old.employee_name, old.category);
+            INSERT INTO tickets_fts (rowid, description, resolution_notes, employee_name, category)
+            VALUES (new.id, new.description, new.resolution_notes, new.employee_name, new.category);
+        END
+    """)
+    conn.execute("INSERT INTO tickets_fts (tickets_fts) VALUES ('rebuild')")
+
+def _m006_daily_rollup(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ticket_daily_stats (
+            day TEXT NOT NULL,
+            status TEXT NOT NULL,
+            category TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            department TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (day, status, category, priority, department)
+        ) WITHOUT ROWID
+    """)
+    rebuild_daily_rollup(conn)
+
+def rebuild_daily_rollup(conn):
+    """
+    Recompute ticket_daily_stats from the tickets table (migration and bulk loads).
+    Archived tickets are counted too when the archive is attached; attach_archive() first
+    when calling this inside a transaction.
+    """
+    cols = ", ".join(["raised_at"] + ROLLUP_DIMENSIONS)
+    source = " UNION ALL ".join(f"SELECT {cols} FROM {schema}.tickets" for schema in ticket_stores(conn))
+    conn.execute("DELETE FROM ticket_daily_stats")
+    conn.execute(f"""
+        INSERT INTO ticket_daily_stats (day, {', '.join(ROLLUP_DIMENSIONS)}, count)
+        SELECT substr(raised_at, 1, 10), {', '.join(f"COALESCE({d}, '')" for d in ROLLUP_DIMENSIONS)}, COUNT(*)
+        FROM ({source})
+        WHERE raised_at IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5
+    """)
+
+def _m007_change_counter(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS change_counter (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO change_counter (name, value) VALUES ('tickets', 0)")
+
+def _m008_attachment_thumbnails(conn):
+    conn.execute("ALTER TABLE attachments ADD COLUMN thumbnail BLOB")
+    conn.execute("ALTER TABLE attachments ADD COLUMN original_size INTEGER")
+    conn.execute("UPDATE attachments SET original_size = size")
+    # thumbnails for images uploaded before ingestion existed, one BLOB at a time
+    ids = [r[0] for r in conn.execute("SELECT id FROM attachments WHERE mime LIKE 'image/%'")]
+    for att_id in ids:
+        thumb = make_thumbnail(read_attachment(conn, att_id))
+        conn.execute("UPDATE attachments SET thumbnail=? WHERE id=?", (thumb, att_id))
+
+def _m009_sla_tracking(conn):
+    # newly breached tickets are found by range scans on (status, priority, raised_at)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_sla ON tickets(status, priority, raised_at)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sla_breaches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticket_id TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            assigned_to TEXT,
+            raised_at TEXT NOT NULL,
+            due_at TEXT NOT NULL,
+            detected_at TEXT NOT NULL,
+            notified_at TEXT,
+            outbox_id INTEGER,
+            UNIQUE (ticket_id, priority)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sla_breaches_pending ON sla_breaches(id) WHERE notified_at IS NULL")
+    # per priority: open tickets raised up to checked_until have already been checked
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sla_watermarks (
+            priority TEXT PRIMARY KEY,
+            checked_until TEXT NOT NULL
+        )
+    """)
+
+def _m010_attachment_sha_index(conn):
+    # finds blobs left without attachments once tickets move to the archive
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_attachments_sha256 ON attachments(sha256)")
+
+def _m011_change_feed(conn):
+    # each ticket write stamps the change counter value it produced, so readers can ask
+    # for "changes since N" with an index range scan; rows written before this are seq 0
+    conn.execute("ALTER TABLE tickets ADD COLUMN updated_at TEXT")
+    conn.execute("ALTER TABLE tickets ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0")
+    conn.execute("UPDATE tickets SET updated_at = COALESCE(resolved_at, raised_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_change_seq ON tickets(change_seq)")
+    # tickets that left the live table (archived), for sessions holding them in a page
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ticket_removals (
+            ticket_id TEXT PRIMARY KEY,
+            change_seq INTEGER NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ticket_removals_seq ON ticket_removals(change_seq)")
+
+def _m012_duplicate_index(conn):
+    # LSH bucket keys of open tickets; a ticket's rows go when it is resolved, so the
+    # index (and every duplicate lookup) only ever covers the open set
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ticket_lsh (
+            bucket INTEGER NOT NULL,
+            ticket_id TEXT NOT NULL,
+            PRIMARY KEY (bucket, ticket_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ticket_lsh_ticket ON ticket_lsh(ticket_id)")
+    rebuild_duplicate_index(conn)
+
+def rebuild_duplicate_index(conn):
+    """Recompute ticket_lsh for every open ticket."""
+    conn.execute("DELETE FROM ticket_lsh")
+    rows = conn.execute("SELECT ticket_id, category, description FROM tickets WHERE status != 'Resolved'")
+    index_duplicates(conn, [(ticket_id, duplicate_keys(category, description))
+                            for ticket_id, category, description in rows.fetchall()])
+
+def _m013_resolution_rollup(conn):
+    # resolved tickets per (raised day or month, priority, resolution-time bucket) with their SLA
+    # breaches; Reports computes median/p90 from these cells instead of sorting the tickets in range
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ticket_resolution_stats (
+            period TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            minutes INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            breaches INTEGER NOT NULL,
+            PRIMARY KEY (period, priority, minutes)
+        ) WITHOUT ROWID
+    """)
+    rebuild_resolution_stats(conn)
+
+def _resolution_cells(source):
+    """
+    SQL (and its parameters) grouping the resolved tickets of `source` into resolution cells:
+    period (each ticket counts once under its raised day YYYY-MM-DD and once under its month
+    YYYY-MM), priority, minutes (lower bound of the bucket: 15 min under a day, 1 h under 30 days,
+    1 day beyond), n, b (SLA breaches).
+    """
+    sla = ", ".join("(?, ?)" for _ in SLA_HOURS)
+    sql = f"""
+        SELECT substr(day, 1, level.column1) AS period, priority,
+               CASE WHEN hours < 24 THEN CAST(hours * 4 AS INTEGER) * 15
+                    WHEN hours < 720 THEN CAST(hours AS INTEGER) * 60
+                    ELSE CAST(hours / 24 AS INTEGER) * 1440 END AS minutes,
+               COUNT(*) AS n, SUM(target IS NOT NULL AND hours > target) AS b
+        FROM (
+            SELECT substr(t.raised_at, 1, 10) AS day, COALESCE(t.priority, '') AS priority,
+                   MAX((julianday(t.resolved_at) - julianday(t.raised_at)) * 24.0, 0) AS hours,
+                   s.column2 AS target
+            FROM ({source}) t LEFT JOIN (VALUES {sla}) s ON s.column1 = t.priority
+            WHERE t.status = 'Resolved' AND t.resolved_at IS NOT NULL AND t.raised_at IS NOT NULL
+        ), (VALUES (10), (7)) level
+        WHERE hours IS NOT NULL
+        GROUP BY 1, 2, 3
+    """
+    return sql, [v for item in SLA_HOURS.items() for v in item]
+
+def rebuild_resolution_stats(conn):
+    """Recompute ticket_resolution_stats (live and, when attached, archived tickets)."""
+    source = " UNION ALL ".join(f"SELECT priority, status, raised_at, resolved_at FROM {store}.tickets"
+                                for store in ticket_stores(conn))
+    cells, params = _resolution_cells(source)
+    conn.execute("DELETE FROM ticket_resolution_stats")
+    conn.execute(f"INSERT INTO ticket_resolution_stats (period, priority, minutes, count, breaches) {cells}",
+                 params)
+
+def _m014_unassigned_empty(conn):
+    # "unassigned" is stored as '' only, so the assignee filter is one index equality
+    conn.execute("UPDATE tickets SET assigned_to = '' WHERE assigned_to IS NULL")
+
+MIGRATIONS = [
+    (1, _m001_base_schema),
+    (2, _m002_indexes_and_counters),
+    (3, _m003_email_outbox),
+    (4, _m004_dashboard_indexes),
+    (5, _m005_fulltext_search),
+    (6, _m006_daily_rollup),
+    (7, _m007_change_counter),
+    (8, _m008_attachment_thumbnails),
+    (9, _m009_sla_tracking),
+    (10, _m010_attachment_sha_index),
+    (11, _m011_change_feed),
+    (12, _m012_duplicate_index),
+    (13, _m013_resolution_rollup),
+    (14, _m014_unassigned_empty),
+]
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """Apply pending migrations in order. Returns the resulting schema version."""
+    version = schema_version(conn)
+    if version < MIGRATIONS[-1][0]:
+        attach_archive(conn)  # so rollup rebuilds in pending steps count archived tickets too
+    for target, step in MIGRATIONS:
+        if target <= version:
+            continue
+        with transaction(conn):
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+        version = target
+    return version
+
+def migrate_inline_attachments(conn):
+    """
+    Move bytes from the legacy tickets.attachment column into the attachment store.
+    Rows are copied one at a time so the migration never holds every BLOB in memory.
+    Runs inside the caller's transaction. Returns the number of attachments moved.
+    """
+    if "attachment" not in _table_columns(conn, "tickets"):
+        return 0
+    ids = [r[0] for r in conn.execute(
+        "SELECT id FROM tickets WHERE attachment IS NOT NULL AND length(attachment) > 0")]
+    for row_id in ids:
+        ticket_id, name, data, raised_at = conn.execute(
+            "SELECT ticket_id, attachment_name, attachment, raised_at FROM tickets WHERE id=?",
+            (row_id,)).fetchone()
+        # only the columns of the base schema exist at this point (thumbnails come in migration 8)
+        data = bytes(data)
+        conn.execute(
+            "INSERT INTO attachments (ticket_id, name, mime, size, sha256, created_at) VALUES (?,?,?,?,?,?)",
+            (ticket_id, name or "attachment", guess_mime(name), len(data), _put_blob(conn, data), raised_at))
+        conn.execute("UPDATE tickets SET attachment=NULL WHERE id=?", (row_id,))
+    return len(ids)
+
+# Attachment store
+def guess_mime(name):
+    mime, _ = mimetypes.guess_type(name or "")
+    return mime or "application/octet-stream"
+
+def _put_blob(conn, data):
+    digest = hashlib.sha256(data).hexdigest()
+    conn.execute("INSERT OR IGNORE INTO attachment_blobs (sha256, data) VALUES (?,?)", (digest, data))
+    return digest
+
+def save_attachment(conn, ticket_id, name, data, mime=None, created_at=None, thumbnail=None,
+                    original_size=None):
+    """
+    Store attachment bytes (deduplicated by sha256) and link them to a ticket.
+    Does not commit; callers include it in their own transaction.
+    """
+    digest = _put_blob(conn, data)
+    cur = conn.execute(
+        """INSERT INTO attachments (ticket_id, name, mime, size, sha256, created_at, thumbnail, original_size)
+           VALUES (?,?,?,?,?,?,?,?)""",
+        (ticket_id, name or "attachment", mime or guess_mime(name), len(data), digest,
+         created_at or datetime.now().isoformat(), thumbnail, original_size or len(data)))
+    return cur.lastrowid
+
+def _store(conn, archived):
+    return "archive" if archived and attach_archive(conn) else "main"
+
+@instrumented("db")
+def get_thumbnail(conn, attachment_id, archived=False):
+    row = conn.execute(f"SELECT thumbnail FROM {_store(conn, archived)}.attachments WHERE id=?",
+                       (attachment_id,)).fetchone()
+    return row[0] if row else None
+
+@instrumented("db")
+def list_attachments(conn, ticket_id):
+    c = conn.execute(
+        "SELECT id, name, mime, size, sha256, created_at FROM attachments WHERE ticket_id=? ORDER BY id",
+        (ticket_id,))
+    cols = [d[0] for d in c.description]
+    return [dict(zip(cols, r)) for r in c.fetchall()]
+
+def iter_attachment(conn, attachment_id, chunk_size=BLOB_CHUNK_SIZE, archived=False):
+    """Yield the attachment bytes in chunks without materialising the whole BLOB."""
+    store = _store(conn, archived)
+    row = conn.execute(
+        f"""SELECT b.rowid FROM {store}.attachments a JOIN {store}.attachment_blobs b ON b.sha256 = a.sha256
+            WHERE a.id=?""", (attachment_id,)).fetchone()
+    if not row:
+        return
+    with conn.blobopen("attachment_blobs", "data", row[0], readonly=True, name=store) as blob:
+        while True:
+            chunk = blob.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+@instrumented("db")
+def read_attachment(conn, attachment_id, archived=False):
+    return b"".join(iter_attachment(conn, attachment_id, archived=archived))
+
+# Change counter (bumped by every ticket write; used to invalidate cached reads and,
+# stamped on the rows as change_seq, as the position in the change feed)
+def bump_change_counter(conn, name="tickets"):
+    """Advance the counter inside the caller's transaction. Returns the new value."""
+    row = conn.execute("UPDATE change_counter SET value = value + 1 WHERE name=? RETURNING value",
+                       (name,)).fetchone()
+    return row[0] if row else 0
+
+def change_generation(conn, name="tickets"):
+    row = conn.execute("SELECT value FROM change_counter WHERE name=?", (name,)).fetchone()
+    return row[0] if row else 0
+
+def _frame(rows, columns):
+    """DataFrame from row tuples; pandas is imported on first use rather than at app start."""
+    import pandas as pd
+    return pd.DataFrame(rows, columns=columns)
+
+# Ticket DB operations
+def format_ticket_id(day, seq):
+    return f"{day}-{str(seq).zfill(3)}"
+
+@instrumented("db")
+def generate_ticket_id(conn):
+    """Preview the next ticket ID for today (PK lookup; does not reserve it)."""
+    today = datetime.now().strftime("%Y-%m-%d")
+    row = conn.execute("SELECT last_seq FROM ticket_counters WHERE day=?", (today,)).fetchone()
+    return format_ticket_id(today, (row[0] if row else 0) + 1)
+
+def allocate_ticket_id(conn, day):
+    """
+    Reserve the next sequence number for `day`. Must run inside the insert's transaction:
+    the upsert takes the write lock first, so concurrent submitters cannot share an ID.
+    """
+    conn.execute("""
+        INSERT INTO ticket_counters (day, last_seq) VALUES (?, 1)
+        ON CONFLICT(day) DO UPDATE SET last_seq = last_seq + 1
+    """, (day,))
+    seq = conn.execute("SELECT last_seq FROM ticket_counters WHERE day=?", (day,)).fetchone()[0]
+    return format_ticket_id(day, seq)
+
+def allocate_ticket_ids(conn, day, count):
+    """Reserve `count` consecutive sequence numbers for `day` with one upsert (bulk imports)."""
+    conn.execute("""
+        INSERT INTO ticket_counters (day, last_seq) VALUES (?, ?)
+        ON CONFLICT(day) DO UPDATE SET last_seq = last_seq + excluded.last_seq
+    """, (day, count))
+    last = conn.execute("SELECT last_seq FROM ticket_counters WHERE day=?", (day,)).fetchone()[0]
+    return [format_ticket_id(day, seq) for seq in range(last - count + 1, last + 1)]
+
+def reserve_ticket_seq(conn, day, seq):
+    """Keep generated IDs for `day` above an explicitly supplied YYYY-MM-DD-NNN sequence number."""
+    conn.execute("""
+        INSERT INTO ticket_counters (day, last_seq) VALUES (?, ?)
+        ON CONFLICT(day) DO UPDATE SET last_seq = MAX(last_seq, excluded.last_seq)
+    """, (day, seq))
+
+@instrumented("db")
+def add_ticket(conn, data):
+    """
+    Insert a ticket, allocating its ID in the same transaction unless data["ticket_id"]
+    is supplied. Returns the ticket ID.
+    """
+    now = datetime.now()
+    c = conn.cursor()
+    attachment = None
+    if data.get("attachment"):
+        # size limits, EXIF stripping, recompression and thumbnail happen before the write lock
+        attachment = prepare_attachment(data.get("attachment_name"), data["attachment"],
+                                        guess_mime(data.get("attachment_name")))
+    dup_keys = duplicate_keys(data["category"], data["description"])
+    with transaction(conn):
+        ticket_id = data.get("ticket_id") or allocate_ticket_id(conn, now.strftime("%Y-%m-%d"))
+        seq = bump_change_counter(conn)
+        c.execute('''INSERT INTO tickets
+                     (ticket_id, employee_name, department, contact, identification, category,
+                      priority, description, attachment_name, status, assigned_to, raised_at,
+                      updated_at, change_seq)
+                     VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)''',
+                  (ticket_id, data["employee_name"], data["department"], data["contact"],
+                   data.get("identification",""), data["category"], data["priority"],
+                   data["description"], data.get("attachment_name"),
+                   "Open", "", now.isoformat(), now.isoformat(), seq))
+        bump_rollup(conn, (now.strftime("%Y-%m-%d"), "Open", data["category"], data["priority"],
+                           data["department"]), 1)
+        index_duplicates(conn, [(ticket_id, dup_keys)])
+        if attachment:
+            save_attachment(conn, ticket_id, data.get("attachment_name"), attachment["data"],
+                            mime=attachment["mime"], thumbnail=attachment["thumbnail"],
+                            original_size=attachment["original_size"])
+    return ticket_id
+
+def _ticket_select(store="main"):
+    cols = ", ".join(f"t.{col}" for col in TICKET_COLUMNS)
+    return f"""
+        SELECT {cols},
+               a.id AS attachment_id, a.mime AS attachment_mime,
+               a.size AS attachment_size, a.sha256 AS attachment_sha256,
+               a.thumbnail IS NOT NULL AS attachment_has_thumbnail
+        FROM {store}.tickets t
+        LEFT JOIN {store}.attachments a ON a.id = (
+            SELECT MIN(id) FROM {store}.attachments WHERE ticket_id = t.ticket_id
+        )
+    """
+
+@instrumented("db")
+def fetch_tickets(conn):
+    c = conn.cursor()
+    c.execute(_ticket_select() + " ORDER BY t.raised_at DESC")
+    cols = [d[0] for d in c.description]
+    rows = c.fetchall()
+    return _frame(rows, cols)
+
+# Columns shown in the dashboard ticket list
+LIST_COLUMNS = ["id", "ticket_id", "raised_at", "employee_name", "department", "category",
+                "priority", "status", "assigned_to", "resolved_at", "updated_at"]
+
+def _filter_clause(filters):
+    """
+    Build a WHERE clause from dashboard filters:
+    status/priority/department (lists), assigned_to (str, "" = unassigned),
+    date_from/date_to (date or ISO string, inclusive).
+    """
+    filters = filters or {}
+    where, params = [], []
+    for col in ("status", "priority", "department"):
+        values = filters.get(col)
+        if values:
+            where.append(f"{col} IN ({','.join('?' * len(values))})")
+            params.extend(values)
+    # a plain equality so idx_tickets_assigned (assigned_to, raised_at) serves the filter;
+    # unassigned is always '' (migration 14), never NULL
+    if filters.get("assigned_to") is not None:
+        where.append("assigned_to = ?")
+        params.append(filters["assigned_to"])
+    if filters.get("date_from"):
+        where.append("raised_at >= ?")
+        params.append(str(filters["date_from"]))
+    if filters.get("date_to"):
+        # inclusive end date: everything before the start of the next day
+        where.append("raised_at < ?")
+        params.append(str(filters["date_to"]) + "T99")
+    return where, params
+
+@instrumented("db")
+def query_tickets(conn, filters=None, after=None, limit=25):
+    """
+    One page of the ticket list, newest first, with filters applied in SQL.
+    `after` is the (raised_at, id) keyset cursor of the previous page's last row.
+    Returns (DataFrame, next_cursor or None).
+    """
+    where, params = _filter_clause(filters)
+    if after:
+        where.append("(raised_at, id) < (?, ?)")
+        params.extend(after)
+    sql = f"SELECT {', '.join(LIST_COLUMNS)} FROM tickets"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY raised_at DESC, id DESC LIMIT ?"
+    rows = conn.execute(sql, params + [limit + 1]).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = (rows[-1][2], rows[-1][0]) if has_more else None
+    return _frame(rows, LIST_COLUMNS), next_cursor
+
+@instrumented("db")
+def changes_since(conn, seq, filters=None, limit=500):
+    """
+    Ticket list rows written after change sequence `seq` (a range scan on change_seq), with
+    `matches` telling whether each still passes the dashboard filters, plus the IDs of tickets
+    that left the live table. Returns (DataFrame, removed IDs, new seq), or None when more than
+    `limit` tickets changed and reloading the page is cheaper.
+    """
+    current = change_generation(conn)
+    cols = LIST_COLUMNS + ["matches"]
+    if current <= seq:
+        return _frame([], cols), [], seq
+    where, params = _filter_clause(filters)
+    # bounded by `current` so rows committed after the counter was read come in the next call
+    rows = conn.execute(f"""
+        SELECT {', '.join(LIST_COLUMNS)}, {' AND '.join(where) or '1'}
+        FROM tickets WHERE change_seq > ? AND change_seq <= ?
+        ORDER BY change_seq LIMIT ?
+    """, params + [seq, current, limit + 1]).fetchall()
+    removed = [r[0] for r in conn.execute(
+        "SELECT ticket_id FROM ticket_removals WHERE change_seq > ? AND change_seq <= ? LIMIT ?",
+        (seq, current, limit + 1))]
+    if len(rows) + len(removed) > limit:
+        return None
+    return _frame(rows, cols), removed, current
+
+def merge_changes(page, next_cursor, after, limit, changed, removed):
+    """
+    Apply changes_since() output to a page from query_tickets(filters, after, limit).
+    Returns the updated (page, next_cursor), or None when rows dropped out of a page that
+    has more rows after it and it has to be reloaded.
+    """
+    import pandas as pd
+    gone = set(changed["ticket_id"]) | set(removed)
+    kept = page[~page["ticket_id"].isin(gone)]
+
+    def on_page(r):
+        key = (r["raised_at"], r["id"])
+        return (after is None or key < tuple(after)) and (next_cursor is None or key >= tuple(next_cursor))
+
+    fresh = changed[[bool(m) and on_page(r) for m, r in zip(changed["matches"], changed.to_dict("records"))]]
+    merged = pd.concat([kept, fresh.drop(columns="matches")], ignore_index=True)
+    merged = merged.sort_values(["raised_at", "id"], ascending=False, ignore_index=True)
+    if next_cursor is not None and len(merged) < len(page):
+        return None
+    if len(merged) > limit:
+        merged = merged.iloc[:limit]
+        next_cursor = (merged["raised_at"].iloc[-1], int(merged["id"].iloc[-1]))
+    return merged, next_cursor
+
+@instrumented("db")
+def get_ticket(conn, ticket_id):
+    """
+    Full detail (with attachment metadata) for one ticket, or None. Falls back to the
+    archive; "archived" tells which store the ticket (and its attachment) came from.
+    """
+    for store in ("main", "archive"):
+        if store == "archive" and not attach_archive(conn):
+            break
+        c = conn.execute(_ticket_select(store) + " WHERE t.ticket_id = ?", (ticket_id,))
+        row = c.fetchone()
+        if row:
+            ticket = dict(zip([d[0] for d in c.description], row))
+            ticket["archived"] = store == "archive"
+            return ticket
+    return None
+
+def fts_query(text):
+    """Turn free text into a safe FTS5 query: every word must match, as a prefix."""
+    words = re.findall(r"\w+", text or "")
+    return " ".join('"' + w + '"*' for w in words)
+
+@instrumented("db")
+def search_tickets(conn, text, limit=20):
+    """
+    Ranked (bm25) full-text search over description, resolution notes, employee name and
+    category, in the live tables and the archive. The `snippet` column is HTML-escaped with
+    matches wrapped in <mark>; `archived` flags hits from the archive.
+    """
+    query = fts_query(text)
+    cols = ["ticket_id", "status", "priority", "employee_name", "raised_at", "snippet", "archived"]
+    if not query:
+        return _frame([], cols)
+    stores = ticket_stores(conn)
+    sql = " UNION ALL ".join(f"""
+        SELECT t.ticket_id, t.status, t.priority, t.employee_name, t.raised_at,
+               snippet(tickets_fts, -1, char(2), char(3), '…', 16), {int(store == "archive")}, rank
+        FROM {store}.tickets_fts
+        JOIN {store}.tickets t ON t.id = tickets_fts.rowid
+        WHERE tickets_fts MATCH ?
+    """ for store in stores)
+    rows = conn.execute(f"SELECT * FROM ({sql}) ORDER BY rank LIMIT ?", [query] * len(stores) + [limit]).fetchall()
+    rows = [r[:5] + (html.escape(r[5] or "").replace("\x02", "<mark>").replace("\x03", "</mark>"), bool(r[6]))
+            for r in rows]
+    return _frame(rows, cols)
+
+@instrumented("db")
+def distinct_assignees(conn):
+    return [r[0] for r in conn.execute(
+        "SELECT DISTINCT assigned_to FROM tickets WHERE COALESCE(assigned_to, '') != '' ORDER BY assigned_to")]
+
+# Near-duplicates (candidates from shared LSH buckets, confirmed by trigram similarity)
+DUPLICATE_COLUMNS = ["ticket_id", "status", "priority", "category", "employee_name", "raised_at", "description"]
+
+def index_duplicates(conn, entries):
+    """Add [(ticket_id, bucket keys)] to ticket_lsh, inside the caller's transaction."""
+    conn.executemany("INSERT OR IGNORE INTO ticket_lsh (bucket, ticket_id) VALUES (?, ?)",
+                     [(key, ticket_id) for ticket_id, keys in entries for key in keys])
+
+def _reindex_duplicates(conn, ticket_id, updates):
+    """Drop a ticket's buckets once resolved; rebuild them when reopened or its text changed."""
+    if not {"status", "category", "description"} & set(updates):
+        return
+    row = conn.execute("SELECT category, description, status FROM tickets WHERE ticket_id=?",
+                       (ticket_id,)).fetchone()
+    is_open = row is not None and row[2] != "Resolved"
+    indexed = conn.execute("SELECT 1 FROM ticket_lsh WHERE ticket_id=? LIMIT 1", (ticket_id,)).fetchone()
+    if is_open and indexed and not {"category", "description"} & set(updates):
+        return
+    conn.execute("DELETE FROM ticket_lsh WHERE ticket_id=?", (ticket_id,))
+    if is_open:
+        index_duplicates(conn, [(ticket_id, duplicate_keys(row[0], row[1]))])
+
+@instrumented("db")
+def find_duplicates(conn, category, description, limit=5, exclude=None):
+    """
+    Open tickets that look like the same issue: one index probe per LSH band, then exact
+    trigram similarity >= DUPLICATE_THRESHOLD. List of dicts (DUPLICATE_COLUMNS + similarity),
+    most similar first.
+    """
+    keys = duplicate_keys(category, description)
+    if not keys:
+        return []
+    rows = conn.execute(f"""
+        SELECT {', '.join(DUPLICATE_COLUMNS)} FROM tickets
+        WHERE ticket_id IN (SELECT ticket_id FROM ticket_lsh WHERE bucket IN ({','.join('?' * len(keys))}))
+          AND status != 'Resolved'
+        ORDER BY raised_at DESC LIMIT 200
+    """, keys).fetchall()
+    target = shingles(description)
+    scored = [r + (round(jaccard(target, shingles(r[6])), 2),) for r in rows if r[0] != exclude]
+    scored = sorted((r for r in scored if r[-1] >= DUPLICATE_THRESHOLD), key=lambda r: -r[-1])
+    return [dict(zip(DUPLICATE_COLUMNS + ["similarity"], r)) for r in scored[:limit]]
+
+@instrumented("db")
+def duplicate_groups(conn, min_size=2):
+    """
+    Groups of open near-duplicate tickets, largest first, each a list of dicts (DUPLICATE_COLUMNS)
+    oldest first. Within each LSH bucket a ticket is compared with the bucket's representatives
+    (the oldest ticket of every distinct issue seen there so far) and joined to the first one it
+    matches at DUPLICATE_THRESHOLD, otherwise it becomes a representative itself. Tickets are
+    only ever joined after a passing similarity check, so unrelated issues that happen to share
+    a bucket stay apart, and an outage bucket with one issue costs one check per ticket.
+    """
+    buckets = []
+    for _, rows in groupby(conn.execute("SELECT bucket, ticket_id FROM ticket_lsh ORDER BY bucket"),
+                           key=lambda r: r[0]):
+        members = [r[1] for r in rows]
+        if len(members) > 1:
+            buckets.append(members)
+    ids = sorted({t for members in buckets for t in members})
+    tickets = {}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        for row in conn.execute(f"SELECT {', '.join(DUPLICATE_COLUMNS)} FROM tickets "
+                                f"WHERE ticket_id IN ({','.join('?' * len(chunk))})", chunk):
+            tickets[row[0]] = dict(zip(DUPLICATE_COLUMNS, row))
+    grams, parent = {}, {}
+
+    def gram(t):
+        if t not in grams:
+            grams[t] = shingles(tickets[t]["description"])
+        return grams[t]
+
+    def root(t):
+        while parent[t] != t:
+            parent[t] = parent[parent[t]]
+            t = parent[t]
+        return t
+
+    for members in buckets:
+        reps = []
+        for t in sorted((t for t in members if t in tickets), key=lambda t: tickets[t]["raised_at"] or ""):
+            parent.setdefault(t, t)
+            match = next((r for r in reps if jaccard(gram(r), gram(t)) >= DUPLICATE_THRESHOLD), None)
+            if match is None:
+                reps.append(t)
+            elif root(t) != root(match):
+                parent[root(t)] = root(match)
+    groups = {}
+    for t in parent:
+        groups.setdefault(root(t), []).append(tickets[t])
+    groups = [sorted(g, key=lambda d: d["raised_at"] or "") for g in groups.values() if len(g) >= min_size]
+    return sorted(groups, key=len, reverse=True)
+
+def _rollup_key(conn, ticket_id):
+    return conn.execute(
+        f"SELECT substr(raised_at, 1, 10), {', '.join(ROLLUP_DIMENSIONS)} FROM tickets WHERE ticket_id=?",
+        (ticket_id,)).fetchone()
+
+@instrumented("db")
+def update_ticket(conn, ticket_id, updates):
+    c = conn.cursor()
+    if "assigned_to" in updates:
+        updates = {**updates, "assigned_to": updates["assigned_to"] or ""}
+    set_clause = ", ".join([f"{k}=?" for k in updates.keys()] + ["updated_at=?", "change_seq=?"])
+    touches_rollup = any(k in ROLLUP_DIMENSIONS for k in updates)
+    touches_resolution = bool({"status", "priority", "raised_at", "resolved_at"} & set(updates))
+    with transaction(conn):
+        old_key = _rollup_key(conn, ticket_id) if touches_rollup else None
+        if touches_resolution:
+            bump_resolution_stats(conn, "ticket_id = ?", [ticket_id], -1)
+        seq = bump_change_counter(conn)
+        params = list(updates.values()) + [datetime.now().isoformat(), seq, ticket_id]
+        c.execute(f"UPDATE tickets SET {set_clause} WHERE ticket_id=?", params)
+        _reindex_duplicates(conn, ticket_id, updates)
+        if touches_resolution:
+            bump_resolution_stats(conn, "ticket_id = ?", [ticket_id], 1)
+        if old_key:
+            new_key = _rollup_key(conn, ticket_id)
+            if new_key != old_key:
+                bump_rollup(conn, old_key, -1)
+                bump_rollup(conn, new_key, 1)
+
+# Reports (read the daily rollup, never the tickets table)
+def bump_rollup(conn, key, delta):
+    """Add `delta` to the rollup cell for key = (day, status, category, priority, department)."""
+    if not key or not key[0]:
+        return
+    key = tuple("" if v is None else v for v in key)
+    conn.execute("""
+        INSERT INTO ticket_daily_stats (day, status, category, priority, department, count)
+        VALUES (?,?,?,?,?,?)
+        ON CONFLICT (day, status, category, priority, department)
+        DO UPDATE SET count = count + excluded.count
+    """, key + (delta,))
+    if delta < 0:
+        conn.execute("""
+            DELETE FROM ticket_daily_stats
+            WHERE day=? AND status=? AND category=? AND priority=? AND department=? AND count <= 0
+        """, key)
+
+def bump_resolution_stats(conn, where, params, delta):
+    """Add `delta` times the resolution cells of the live tickets matching `where` (no-op unless resolved)."""
+    cells, sla_params = _resolution_cells(
+        f"SELECT priority, status, raised_at, resolved_at FROM main.tickets WHERE {where}")
+    conn.execute(f"""
+        INSERT INTO ticket_resolution_stats (period, priority, minutes, count, breaches)
+        SELECT period, priority, minutes, n * ?, b * ? FROM ({cells}) WHERE true
+        ON CONFLICT (period, priority, minutes)
+        DO UPDATE SET count = count + excluded.count, breaches = breaches + excluded.breaches
+    """, [delta, delta] + list(params) + sla_params)
+    if delta < 0:
+        conn.execute("DELETE FROM ticket_resolution_stats WHERE count <= 0")
+
+def _next_month(month):
+    year, m = int(month[:4]), int(month[5:7])
+    return f"{year + m // 12:04d}-{m % 12 + 1:02d}"
+
+def _previous_month(month):
+    year, m = int(month[:4]), int(month[5:7])
+    return f"{year - (m == 1):04d}-{(m - 2) % 12 + 1:02d}"
+
+def _next_day(day):
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+def _bucket_hours(minutes):
+    """Midpoint of a resolution-time bucket, in hours."""
+    width = 15 if minutes < 1440 else 60 if minutes < 43200 else 1440
+    return (minutes + width / 2) / 60
+
+@instrumented("db")
+def report_daily_counts(conn, start_d, end_d):
+    rows = conn.execute("""
+        SELECT day, SUM(count) FROM ticket_daily_stats
+        WHERE day BETWEEN ? AND ? GROUP BY day HAVING SUM(count) > 0 ORDER BY day
+    """, (str(start_d), str(end_d))).fetchall()
+    import pandas as pd
+    df = _frame(rows, ["date", "Count"])
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+@instrumented("db")
+def report_breakdown(conn, start_d, end_d, dimension):
+    if dimension not in ROLLUP_DIMENSIONS:
+        raise ValueError(f"Unknown rollup dimension: {dimension}")
+    rows = conn.execute(f"""
+        SELECT {dimension}, SUM(count) FROM ticket_daily_stats
+        WHERE day BETWEEN ? AND ? GROUP BY {dimension} HAVING SUM(count) > 0 ORDER BY 2 DESC
+    """, (str(start_d), str(end_d))).fetchall()
+    return _frame(rows, [dimension, "Count"])
+
+@instrumented("db")
+def resolution_stats(conn, start_d, end_d):
+    """
+    Resolution time (hours) for resolved tickets raised in the range (live and archived),
+    from ticket_resolution_stats: one row per priority plus an "All" row, with median, p90
+    (nearest rank, reported as the midpoint of the bucket holding that rank) and SLA breaches.
+    Whole months in the range are read from the month cells, only the days around them from
+    the day cells, so a year costs about as much as two months.
+    """
+    start_d, end_d = str(start_d), str(end_d)
+    first = start_d[:7] if start_d[8:] == "01" else _next_month(start_d[:7])
+    last = end_d[:7] if _next_day(end_d)[:7] != end_d[:7] else _previous_month(end_d[:7])
+    if first <= last:
+        where = ("(period >= ? AND period < ? AND length(period) = 10) "
+                 "OR (period BETWEEN ? AND ? AND length(period) = 7) "
+                 "OR (period > ? AND period <= ? AND length(period) = 10)")
+        params = (start_d, first, first, last, f"{last}-99", end_d)
+    else:
+        where, params = "period BETWEEN ? AND ? AND length(period) = 10", (start_d, end_d)
+    cells = conn.execute(f"""
+        SELECT priority, minutes, SUM(count), SUM(breaches) FROM ticket_resolution_stats
+        WHERE {where} GROUP BY priority, minutes
+    """, params).fetchall()
+    hist, breaches = {}, {}
+    for priority, minutes, n, b in cells:
+        for grp in (priority, "All"):
+            hist.setdefault(grp, {}).setdefault(minutes, 0)
+            hist[grp][minutes] += n
+            breaches[grp] = breaches.get(grp, 0) + b
+    rows = []
+    for grp, counts in hist.items():
+        n = sum(counts.values())
+        ranks, seen, stats = [(n + 1) // 2, (9 * n + 9) // 10], 0, []
+        for minutes in sorted(counts):
+            seen += counts[minutes]
+            while ranks and seen >= ranks[0]:
+                ranks.pop(0)
+                stats.append(_bucket_hours(minutes))
+        rows.append((grp, n, stats[0], stats[1], breaches[grp]))
+    df = _frame(rows, ["priority", "resolved", "median_hours", "p90_hours", "sla_breaches"])
+    order = {p: i for i, p in enumerate(["All"] + list(SLA_HOURS))}
+    return df.sort_values("priority", key=lambda s: s.map(order).fillna(len(order))).reset_index(drop=True)
+
+@instrumented("db")
+def get_ticket_contact(conn, ticket_id):
+    c = conn.cursor()
+    c.execute("SELECT employee_name, contact, category, priority, description FROM tickets WHERE ticket_id=?", (ticket_id,))
+    return c.fetchone()
@@ -0,0 +1,141 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Streaming Export
+---------------------------------------------------------------------
+Exports read the database cursor in chunks and write each chunk straight
+to a temp file, so peak memory depends on the chunk size, not on the
+number of tickets:
+- CSV (csv module)
+- XLSX (openpyxl write_only workbook)
+- Parquet (pyarrow ParquetWriter, one row group per chunk); optional,
+  offered only when pyarrow is installed
+Attachment bytes are never exported; only their metadata columns are.
+Archived tickets are included (the archive is attached on demand).
+---------------------------------------------------------------------
+"""
+
+import csv
+import importlib.util
+import io
+import os
+import tempfile
+
+from helpdesk_db import TICKET_COLUMNS, ticket_stores
+from helpdesk_metrics import instrumented
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Exported columns: ticket fields + attachment metadata (no binary data)
+EXPORT_COLUMNS = TICKET_COLUMNS + ["attachment_mime", "attachment_size"]
+INTEGER_COLUMNS = {"id", "attachment_size"}
+
+EXPORT_FORMATS = {
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV": ("csv", "text/csv"),
+}
+# pyarrow is not in requirements.txt; find_spec checks for it without importing it at startup
+if importlib.util.find_spec("pyarrow"):
+    EXPORT_FORMATS["Parquet"] = ("parquet", "application/vnd.apache.parquet")
+
+def iter_ticket_chunks(conn, start_d=None, end_d=None, columns=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield lists of row tuples for tickets raised in [start_d, end_d] (inclusive, either may be
+    None) from the live and archived tickets, newest first, `chunk_size` rows at a time.
+    """
+    columns = columns or EXPORT_COLUMNS
+    unknown = set(columns) - set(EXPORT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Cannot export columns: {sorted(unknown)}")
+    select = ", ".join(f"t.{col}" if col in TICKET_COLUMNS else f"a.{col[len('attachment_'):]} AS {col}"
+                       for col in columns)
+    where, params = [], []
+    if start_d:
+        where.append("t.raised_at >= ?")
+        params.append(str(start_d))
+    if end_d:
+        where.append("t.raised_at < ?")
+        params.append(f"{end_d}T99")
+    stores = ticket_stores(conn)
+    arms = []
+    for store in stores:
+        arm = f"""
+            SELECT {select}, t.raised_at AS _sort_key
+            FROM {store}.tickets t
+            LEFT JOIN {store}.attachments a
+                   ON a.id = (SELECT MIN(id) FROM {store}.attachments WHERE ticket_id = t.ticket_id)
+        """
+        if where:
+            arm += " WHERE " + " AND ".join(where)
+        arms.append(arm)
+    # the sort key is selected separately because `columns` need not include raised_at
+    sql = f"SELECT {', '.join(columns)} FROM ({' UNION ALL '.join(arms)}) ORDER BY _sort_key DESC"
+    c = conn.cursor()
+    c.execute(sql, params * len(stores))
+    while True:
+        rows = c.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield rows
+
+def write_csv(chunks, columns, path):
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+
+def write_xlsx(chunks, columns, path, sheet_name="Tickets"):
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    ws.append(columns)
+    for rows in chunks:
+        for row in rows:
+            ws.append(list(row))
+    wb.save(path)
+
+def write_parquet(chunks, columns, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow).")
+    schema = pa.schema([(col, pa.int64() if col in INTEGER_COLUMNS else pa.string()) for col in columns])
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in chunks:
+            arrays = [pa.array(list(values), type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx, "parquet": write_parquet}
+
+@instrumented("export")
+def export_tickets(conn, fmt="xlsx", start_d=None, end_d=None, columns=None, chunk_size=EXPORT_CHUNK_SIZE,
+                   directory=None):
+    """
+    Write tickets raised in the range to a temp file in `fmt` (csv/xlsx/parquet).
+    Returns the file path; the caller removes it when done.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    columns = list(columns or EXPORT_COLUMNS)
+    fd, path = tempfile.mkstemp(prefix="tickets_", suffix=f".{fmt}", dir=directory)
+    os.close(fd)
+    try:
+        WRITERS[fmt](iter_ticket_chunks(conn, start_d, end_d, columns, chunk_size), columns, path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+@instrumented("export")
+def df_to_excel_bytes(df):
+    """Small in-memory XLSX for an already loaded DataFrame (write_only, row by row)."""
+    import pandas as pd
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Tickets")
+    ws.append([str(c) for c in df.columns])
+    for row in df.itertuples(index=False):
+        ws.append([None if pd.isna(v) else v for v in row])
+    with io.BytesIO() as buffer:
+        wb.save(buffer)
+        return buffer.getvalue()
@@ -0,0 +1,236 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Bulk Ticket Import
+---------------------------------------------------------------------
+Headless ingestion for backlogs from the old system and for tickets
+raised by monitoring alerts:
+- import_file(): CSV or JSON Lines, read and validated row by row
+  (memory depends on the batch size, not on the file size)
+- import_tickets(): the same for any iterable of dicts
+Each batch is one transaction: ticket IDs allocated per day with one
+upsert, executemany inserts, rollup and change counter bumped once.
+Rows that fail validation are skipped and reported with their line.
+
+Usage:
+    python helpdesk_import.py backlog.csv [--db tickets.db] [--batch-size 5000] [--dry-run]
+    python helpdesk_import.py alerts.jsonl
+---------------------------------------------------------------------
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from helpdesk_db import (
+    DB_PATH, DEPARTMENTS, CATEGORIES, PRIORITIES, STATUSES, init_db, transaction, attach_archive, ticket_stores,
+    allocate_ticket_ids, reserve_ticket_seq, bump_rollup, bump_resolution_stats, bump_change_counter,
+    index_duplicates,
+)
+from helpdesk_similarity import duplicate_keys
+from helpdesk_metrics import instrumented
+
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+REQUIRED_FIELDS = ["employee_name", "department", "category", "priority", "description"]
+OPTIONAL_FIELDS = ["ticket_id", "contact", "identification", "status", "assigned_to", "raised_at",
+                   "resolved_at", "resolution_notes"]
+INSERT_COLUMNS = ["ticket_id", "employee_name", "department", "contact", "identification", "category",
+                  "priority", "description", "status", "assigned_to", "raised_at", "resolved_at",
+                  "resolution_notes", "updated_at", "change_seq"]
+TICKET_ID_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})-(\d+)$")
+
+class RowRejected(ValueError):
+    """A source row failed validation; the message says why."""
+
+def _timestamp(value, field):
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None).isoformat()
+    except ValueError:
+        raise RowRejected(f"{field} is not an ISO date/time: {value!r}")
+
+def validate(record, now=None):
+    """Normalise one source record (dict) into a ticket row dict, or raise RowRejected."""
+    row = {k: (str(record[k]).strip() if record.get(k) is not None else "")
+           for k in REQUIRED_FIELDS + OPTIONAL_FIELDS}
+    missing = [k for k in REQUIRED_FIELDS if not row[k]]
+    if missing:
+        raise RowRejected(f"missing {', '.join(missing)}")
+    priority = row["priority"].capitalize()
+    if priority not in PRIORITIES:
+        raise RowRejected(f"unknown priority {row['priority']!r}")
+    row["priority"] = priority
+    # departments and categories drive the report breakdowns, so only the app's own values go in
+    for field, allowed in (("department", DEPARTMENTS), ("category", CATEGORIES)):
+        value = next((v for v in allowed if v.lower() == row[field].lower()), None)
+        if value is None:
+            raise RowRejected(f"unknown {field} {row[field]!r}")
+        row[field] = value
+    status = next((s for s in STATUSES if s.lower() == (row["status"] or "Open").lower()), None)
+    if status is None:
+        raise RowRejected(f"unknown status {row['status']!r}")
+    row["status"] = status
+    row["raised_at"] = _timestamp(row["raised_at"], "raised_at") if row["raised_at"] \
+        else (now or datetime.now()).isoformat()
+    if row["resolved_at"]:
+        row["resolved_at"] = _timestamp(row["resolved_at"], "resolved_at")
+        if row["resolved_at"] < row["raised_at"]:
+            raise RowRejected("resolved_at is before raised_at")
+    for k in ("ticket_id", "resolved_at", "resolution_notes"):
+        row[k] = row[k] or None
+    return row
+
+def iter_records(path, fmt=None):
+    """Yield (line number, dict) from a CSV (header row) or JSON Lines file, one row at a time."""
+    fmt = fmt or ("jsonl" if os.path.splitext(path)[1].lower() in (".jsonl", ".ndjson", ".json") else "csv")
+    if fmt == "csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+    elif fmt == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    record = e  # reported as a rejected row, the import carries on
+                yield line_no, record
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+def _insert_batch(conn, batch):
+    """Insert validated rows in one transaction. Returns [(line, reason)] for rows skipped as duplicates."""
+    skipped = []
+    # near-duplicate bucket keys for open tickets, hashed before the write lock is taken
+    for _, row in batch:
+        row["dup_keys"] = duplicate_keys(row["category"], row["description"]) if row["status"] != "Resolved" else []
+    with transaction(conn):
+        supplied = [row["ticket_id"] for _, row in batch if row["ticket_id"]]
+        existing = set()
+        for store in ticket_stores(conn):  # archived IDs count as taken too
+            for i in range(0, len(supplied), 500):
+                chunk = supplied[i:i + 500]
+                existing.update(r[0] for r in conn.execute(
+                    f"SELECT ticket_id FROM {store}.tickets WHERE ticket_id IN ({','.join('?' * len(chunk))})",
+                    chunk))
+        rows, needs_id = [], defaultdict(list)
+        for line, row in batch:
+            if row["ticket_id"]:
+                if row["ticket_id"] in existing:
+                    skipped.append((line, f"ticket_id {row['ticket_id']} already exists"))
+                    continue
+                existing.add(row["ticket_id"])
+                m = TICKET_ID_RE.match(row["ticket_id"])
+                if m:
+                    reserve_ticket_seq(conn, m.group(1), int(m.group(2)))
+            else:
+                needs_id[row["raised_at"][:10]].append(row)
+            rows.append(row)
+        # bulk ID allocation: one counter upsert per day in the batch
+        for day, day_rows in needs_id.items():
+            for row, ticket_id in zip(day_rows, allocate_ticket_ids(conn, day, len(day_rows))):
+                row["ticket_id"] = ticket_id
+        if not rows:
+            return skipped
+        # the whole batch is one step in the change feed
+        seq, updated_at = bump_change_counter(conn), datetime.now().isoformat()
+        for row in rows:
+            row["updated_at"], row["change_seq"] = updated_at, seq
+        conn.executemany(f"INSERT INTO tickets ({', '.join(INSERT_COLUMNS)}) "
+                         f"VALUES ({','.join('?' * len(INSERT_COLUMNS))})",
+                         [[row[c] for c in INSERT_COLUMNS] for row in rows])
+        rollup = Counter((row["raised_at"][:10], row["status"], row["category"], row["priority"],
+                          row["department"]) for row in rows)
+        for key, count in rollup.items():
+            bump_rollup(conn, key, count)
+        resolved = [row["ticket_id"] for row in rows if row["status"] == "Resolved"]
+        for i in range(0, len(resolved), 500):
+            chunk = resolved[i:i + 500]
+            bump_resolution_stats(conn, f"ticket_id IN ({','.join('?' * len(chunk))})", chunk, 1)
+        index_duplicates(conn, [(row["ticket_id"], row["dup_keys"]) for row in rows])
+    return skipped
+
+@instrumented("import")
+def import_tickets(conn, records, batch_size=IMPORT_BATCH_SIZE, dry_run=False, progress=None):
+    """
+    Validate and insert tickets from an iterable of dicts or (line, dict) pairs.
+    Returns a dict with read, inserted, rejected, errors [(line, reason)], seconds and rows_per_sec.
+    """
+    t0 = time.perf_counter()
+    result = {"read": 0, "inserted": 0, "rejected": 0, "errors": []}
+
+    def reject(line, reason):
+        result["rejected"] += 1
+        if len(result["errors"]) < MAX_REPORTED_ERRORS:
+            result["errors"].append((line, reason))
+
+    def flush(batch):
+        skipped = [] if dry_run else _insert_batch(conn, batch)
+        for line, reason in skipped:
+            reject(line, reason)
+        result["inserted"] += len(batch) - len(skipped)
+        batch.clear()
+        if progress:
+            progress(result)
+
+    attach_archive(conn)  # not possible once a batch transaction is open
+    batch = []
+    now = datetime.now()
+    for n, item in enumerate(records, 1):
+        line, record = item if isinstance(item, tuple) else (n, item)
+        result["read"] += 1
+        try:
+            if not isinstance(record, dict):
+                raise RowRejected(f"not a JSON object ({record})")
+            batch.append((line, validate(record, now)))
+        except RowRejected as e:
+            reject(line, str(e))
+            continue
+        if len(batch) >= batch_size:
+            flush(batch)
+    if batch:
+        flush(batch)
+    result["seconds"] = time.perf_counter() - t0
+    result["rows_per_sec"] = result["inserted"] / result["seconds"] if result["seconds"] else 0.0
+    return result
+
+def import_file(conn, path, fmt=None, batch_size=IMPORT_BATCH_SIZE, dry_run=False, progress=None):
+    """Stream a CSV / JSON Lines file into the tickets table. See import_tickets() for the result."""
+    return import_tickets(conn, iter_records(path, fmt), batch_size, dry_run, progress)
+
+def main():
+    ap = argparse.ArgumentParser(description="Import tickets from CSV or JSON Lines into the helpdesk database.")
+    ap.add_argument("path", help="CSV (with header row) or .jsonl file")
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    ap.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="rows per transaction")
+    ap.add_argument("--dry-run", action="store_true", help="validate only, write nothing")
+    args = ap.parse_args()
+
+    def progress(r):
+        print(f"\r  {r['read']:,} read, {r['inserted']:,} {'valid' if args.dry_run else 'inserted'}, "
+              f"{r['rejected']:,} rejected", end="", flush=True)
+
+    conn = init_db(args.db)
+    try:
+        result = import_file(conn, args.path, args.format, args.batch_size, args.dry_run, progress)
+    finally:
+        conn.close()
+    print(f"\r{result['read']:,} rows read, {result['inserted']:,} {'valid' if args.dry_run else 'imported'}, "
+          f"{result['rejected']:,} rejected in {result['seconds']:.2f}s ({result['rows_per_sec']:,.0f} rows/s)")
+    for line, reason in result["errors"]:
+        print(f"  line {line}: {reason}")
+    if result["rejected"] > len(result["errors"]):
+        print(f"  ... and {result['rejected'] - len(result['errors'])} more")
+    sys.exit(1 if result["rejected"] else 0)
+
+if __name__ == "__main__":
+    main()
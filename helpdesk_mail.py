@@ -0,0 +1,281 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Email Outbox
+---------------------------------------------------------------------
+- queue_email(): store a rendered notification in email_outbox
+  (runs inside the caller's transaction, never touches the network)
+- OutboxWorker: background thread that drains the outbox over one
+  reused SMTP session, retrying failures with exponential backoff
+  (writes go through the shared Database writer). Without SMTP_USER,
+  SMTP_PASSWORD and a sender address nothing is claimed or sent: the
+  messages stay pending and the worker reports SMTPNotConfigured.
+smtplib and the MIME classes are imported only when a message is sent.
+---------------------------------------------------------------------
+"""
+
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from helpdesk_db import transaction
+from helpdesk_metrics import instrumented
+
+# Load .env
+load_dotenv()
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587") or 587)
+SMTP_USER = os.getenv("SMTP_USER") or ""
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD") or ""
+SMTP_STARTTLS = (os.getenv("SMTP_STARTTLS", "1") or "1").lower() not in ("0", "false", "no")
+FROM_EMAIL = os.getenv("FROM_EMAIL") or SMTP_USER
+IT_RECIPIENTS = [x.strip() for x in os.getenv("IT_RECIPIENTS", "").split(",") if x.strip()]
+
+# Outbox tuning
+OUTBOX_BATCH_SIZE = 25
+OUTBOX_POLL_SECONDS = 5.0
+OUTBOX_MAX_ATTEMPTS = 6
+OUTBOX_BACKOFF_BASE = 30        # seconds; doubles per attempt
+OUTBOX_BACKOFF_MAX = 60 * 60
+OUTBOX_CLAIM_TIMEOUT = 10 * 60  # a 'sending' row older than this is assumed abandoned
+
+# Email rendering
+def render_ticket_email(ticket_info):
+    color = "#eab308" if ticket_info.get("status") == "In Progress" else "#16a34a"
+    return f"""
+    <html><body style='font-family:Segoe UI,Arial,sans-serif;background:#f3f4f6;padding:20px;'>
+    <div style='max-width:600px;margin:auto;background:#fff;border-radius:10px;overflow:hidden;'>
+    <div style='background:#0f172a;color:#fff;padding:12px 20px;'>
+    <b>Infinium IT Helpdesk</b>
+    </div>
+    <div style='padding:20px;color:#111827;'>
+    <p>Dear <b>{ticket_info.get('employee_name','User')}</b>,</p>
+    <p>Your ticket has been updated:</p>
+    <table style='width:100%;border-collapse:collapse;margin:10px 0;'>
+    <tr><td><b>Ticket ID:</b></td><td>{ticket_info.get('ticket_id','')}</td></tr>
+    <tr><td><b>Status:</b></td><td style='color:{color};font-weight:bold'>{ticket_info.get('status','')}</td></tr>
+    <tr><td><b>Category:</b></td><td>{ticket_info.get('category','')}</td></tr>
+    <tr><td><b>Priority:</b></td><td>{ticket_info.get('priority','')}</td></tr>
+    </table>
+    <p><b>Description:</b><br>{ticket_info.get('description','')}</p>
+    <p><b>Resolution Notes:</b><br>{ticket_info.get('resolution_notes','(Not provided)')}</p>
+    <p>Regards,<br><b>Prince Prajapati</b><br>IT Officer – Infinium Pharmachem Limited</p>
+    </div>
+    </div></body></html>
+    """
+
+def build_message(subject, html, to_list, cc=None, from_email=None):
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    msg = MIMEMultipart("alternative")
+    msg["From"] = from_email or FROM_EMAIL
+    msg["To"] = ", ".join(to_list)
+    if cc:
+        msg["Cc"] = ", ".join(cc)
+    msg["Subject"] = subject
+    msg.attach(MIMEText(html, "html", "utf-8"))
+    return msg
+
+# SMTP session
+class SMTPNotConfigured(RuntimeError):
+    """No SMTP credentials or sender address; raised before any network call."""
+
+class SMTPSession:
+    """
+    One lazily opened, authenticated SMTP connection reused across messages.
+    The connection is dropped on transport errors and reopened on the next send.
+    """
+
+    def __init__(self, host=None, port=None, user=None, password=None, starttls=None,
+                 from_email=None, timeout=30):
+        self.host = host or SMTP_HOST
+        self.port = port or SMTP_PORT
+        self.user = SMTP_USER if user is None else user
+        self.password = SMTP_PASSWORD if password is None else password
+        self.starttls = SMTP_STARTTLS if starttls is None else starttls
+        self.from_email = from_email or FROM_EMAIL or self.user
+        self.timeout = timeout
+        self.server = None
+
+    @property
+    def configured(self):
+        return bool(self.user and self.password and self.from_email)
+
+    def open(self):
+        if self.server is not None:
+            return self.server
+        if not self.configured:
+            raise SMTPNotConfigured("SMTP credentials not configured (SMTP_USER, SMTP_PASSWORD, FROM_EMAIL).")
+        import smtplib
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.starttls:
+                server.starttls()
+                server.ehlo()
+            server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+        return server
+
+    @instrumented("smtp", "send")
+    def send(self, subject, html, to_list, cc=None):
+        import smtplib
+        msg = build_message(subject, html, to_list, cc, from_email=self.from_email)
+        recipients = list(to_list) + list(cc or [])
+        try:
+            self.open().sendmail(self.from_email, recipients, msg.as_string())
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+            # message-level rejection; the session itself is still usable
+            raise
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            self.server.close()
+        self.server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# Outbox
+def _split(addrs):
+    return [x for x in (addrs or "").split(",") if x]
+
+@instrumented("outbox")
+def queue_email(conn, subject, ticket_info, to_list, cc=None):
+    """
+    Add a rendered notification to the outbox. Runs inside the caller's transaction
+    (or its own), so a ticket update and its email are committed together.
+    Returns the outbox row id.
+    """
+    return queue_message(conn, subject, render_ticket_email(ticket_info), to_list, cc,
+                         ticket_id=ticket_info.get("ticket_id"))
+
+def queue_message(conn, subject, body_html, to_list, cc=None, ticket_id=None):
+    """Add an already rendered HTML message to the outbox (same transaction rules as queue_email)."""
+    now = datetime.now().isoformat()
+    with transaction(conn):
+        cur = conn.execute('''INSERT INTO email_outbox
+                              (ticket_id, subject, to_addrs, cc_addrs, body_html, status,
+                               attempts, next_attempt_at, created_at)
+                              VALUES (?,?,?,?,?,'pending',0,?,?)''',
+                           (ticket_id, subject, ",".join(to_list), ",".join(cc or []), body_html, now, now))
+    return cur.lastrowid
+
+def list_ticket_emails(conn, ticket_id):
+    c = conn.execute('''SELECT id, subject, to_addrs, status, attempts, last_error, created_at, sent_at
+                        FROM email_outbox WHERE ticket_id=? ORDER BY id DESC''', (ticket_id,))
+    cols = [d[0] for d in c.description]
+    return [dict(zip(cols, r)) for r in c.fetchall()]
+
+def outbox_stats(conn):
+    return dict(conn.execute("SELECT status, COUNT(*) FROM email_outbox GROUP BY status").fetchall())
+
+def backoff_seconds(attempts):
+    return min(OUTBOX_BACKOFF_BASE * (2 ** max(attempts - 1, 0)), OUTBOX_BACKOFF_MAX)
+
+def claim_batch(conn, limit=OUTBOX_BATCH_SIZE, now=None):
+    """Mark up to `limit` due messages as 'sending' for this worker and return them."""
+    now = now or datetime.now()
+    token = uuid.uuid4().hex
+    stale = (now - timedelta(seconds=OUTBOX_CLAIM_TIMEOUT)).isoformat()
+    with transaction(conn):
+        conn.execute('''UPDATE email_outbox SET status='pending', claimed_at=NULL, claim_token=NULL
+                        WHERE status='sending' AND claimed_at < ?''', (stale,))
+        conn.execute('''UPDATE email_outbox SET status='sending', claimed_at=?, claim_token=?
+                        WHERE id IN (SELECT id FROM email_outbox
+                                     WHERE status='pending' AND next_attempt_at <= ?
+                                     ORDER BY id LIMIT ?)''',
+                     (now.isoformat(), token, now.isoformat(), limit))
+        rows = conn.execute('''SELECT id, subject, to_addrs, cc_addrs, body_html, attempts
+                               FROM email_outbox WHERE status='sending' AND claim_token=?
+                               ORDER BY id''', (token,)).fetchall()
+    return rows
+
+@instrumented("smtp")
+def process_outbox(conn, session, limit=OUTBOX_BATCH_SIZE, now=None):
+    """
+    Send one batch of due messages over `session`. Returns (sent, failed) counts.
+    Failed messages are rescheduled with backoff, or marked 'failed' after
+    OUTBOX_MAX_ATTEMPTS. An unconfigured session raises SMTPNotConfigured before anything
+    is claimed, so the messages keep their attempts until SMTP is set up.
+    """
+    if not getattr(session, "configured", True):
+        raise SMTPNotConfigured("SMTP credentials not configured (SMTP_USER, SMTP_PASSWORD, FROM_EMAIL).")
+    sent = failed = 0
+    for msg_id, subject, to_addrs, cc_addrs, html, attempts in claim_batch(conn, limit, now):
+        try:
+            session.send(subject, html, _split(to_addrs), _split(cc_addrs))
+        except Exception as e:
+            attempts += 1
+            status = "failed" if attempts >= OUTBOX_MAX_ATTEMPTS else "pending"
+            retry_at = datetime.now() + timedelta(seconds=backoff_seconds(attempts))
+            with transaction(conn):
+                conn.execute('''UPDATE email_outbox SET status=?, attempts=?, next_attempt_at=?,
+                                claimed_at=NULL, claim_token=NULL, last_error=? WHERE id=?''',
+                             (status, attempts, retry_at.isoformat(), str(e)[:500], msg_id))
+            failed += 1
+            continue
+        with transaction(conn):
+            conn.execute('''UPDATE email_outbox SET status='sent', attempts=?, sent_at=?,
+                            claimed_at=NULL, claim_token=NULL, last_error=NULL WHERE id=?''',
+                         (attempts + 1, datetime.now().isoformat(), msg_id))
+        sent += 1
+    return sent, failed
+
+class OutboxWorker(threading.Thread):
+    """
+    Daemon thread that drains email_outbox through the shared Database writer,
+    keeping one SMTP session open while there is work and closing it when idle.
+    """
+
+    def __init__(self, database, session_factory=SMTPSession, poll_seconds=OUTBOX_POLL_SECONDS,
+                 batch_size=OUTBOX_BATCH_SIZE):
+        super().__init__(name="helpdesk-outbox", daemon=True)
+        self.database = database
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.last_run = None
+        self.last_error = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wake.set()
+        self.join(timeout)
+
+    def run(self):
+        session = self.session_factory()
+        try:
+            while not self._stopping.is_set():
+                try:
+                    sent, failed = process_outbox(self.database.writer, session, self.batch_size)
+                    self.last_error = None
+                except Exception as e:
+                    sent = failed = 0
+                    self.last_error = str(e)
+                self.last_run = datetime.now()
+                if sent + failed >= self.batch_size:
+                    continue  # more may be due; keep the session warm
+                session.close()
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+        finally:
+            session.close()
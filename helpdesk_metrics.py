@@ -0,0 +1,223 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Timing & Metrics
+---------------------------------------------------------------------
+Lightweight, process-wide instrumentation:
+- @instrumented("db") records how long each database call, export,
+  outbox write and SMTP send takes; the app records its page renders
+  with METRICS.record("page.<name>", seconds)
+- rolling window per operation -> p50 / p95 / p99 for the officer
+  "Performance" page
+- MetricsExporter: background thread writing the numbers in
+  Prometheus text format to METRICS_FILE (node_exporter textfile style)
+- anything slower than SLOW_QUERY_MS goes to SLOW_QUERY_LOG, with its
+  parameters reduced to ids, dates, numbers and sizes (names, contacts,
+  descriptions, search text and attachment bytes are never written)
+---------------------------------------------------------------------
+"""
+
+import functools
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import date, datetime
+from logging.handlers import RotatingFileHandler
+from dotenv import load_dotenv
+
+load_dotenv()
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "1000") or 1000)          # samples kept per operation
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "250") or 250)
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "slow_queries.log")
+METRICS_FILE = os.getenv("METRICS_FILE", "helpdesk_metrics.prom")
+METRICS_EXPORT_SECONDS = float(os.getenv("METRICS_EXPORT_SECONDS", "15") or 15)
+RECENT_SLOW = 100                                                           # slow entries kept for the UI
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+def _quantile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+# strings shown verbatim in the slow log: ticket IDs and ISO dates/times; any other text
+# (names, contacts, descriptions, search terms) is logged as its length only
+_SAFE_TEXT = re.compile(r"^\d{4}-\d{2}-\d{2}(-\d+|[T ][\d:.]+)?$")
+
+def _safe(value, depth=0):
+    if value is None or isinstance(value, (bool, int, float, date)):
+        return repr(value) if not isinstance(value, date) else value.isoformat()
+    if isinstance(value, str):
+        return repr(value) if _SAFE_TEXT.match(value) else f"<str {len(value)}>"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<bytes {len(value)}>"
+    if isinstance(value, dict):
+        if depth:
+            return f"<dict {len(value)}>"
+        return "{" + ", ".join(f"{k}: {_safe(v, depth + 1)}" for k, v in value.items()) + "}"
+    if isinstance(value, (list, tuple, set)):
+        return f"<{type(value).__name__} {len(value)}>"
+    return f"<{type(value).__name__}>"
+
+def _describe_args(args, kwargs):
+    """Short, log-safe rendering of a call's parameters (connections are left out, text reduced to sizes)."""
+    parts = [_safe(a) for a in args if not isinstance(a, sqlite3.Connection)]
+    parts += [f"{k}={_safe(v)}" for k, v in kwargs.items()]
+    text = ", ".join(parts)
+    return text if len(text) <= 200 else text[:197] + "..."
+
+class Metrics:
+    """Thread-safe registry of operation timings: a rolling window plus lifetime totals per name."""
+
+    def __init__(self, window=METRICS_WINDOW, slow_ms=SLOW_QUERY_MS, slow_log=SLOW_QUERY_LOG):
+        self.window = window
+        self.slow_ms = slow_ms
+        self.slow_log = slow_log
+        self.started_at = datetime.now()
+        self._ops = {}
+        self._recent_slow = deque(maxlen=RECENT_SLOW)
+        self._lock = threading.Lock()
+        self._logger = None
+
+    def record(self, name, seconds, error=False, detail=None):
+        with self._lock:
+            op = self._ops.get(name)
+            if op is None:
+                op = self._ops[name] = {"samples": deque(maxlen=self.window), "count": 0, "sum": 0.0,
+                                        "errors": 0, "slow": 0, "max": 0.0}
+            op["samples"].append(seconds)
+            op["count"] += 1
+            op["sum"] += seconds
+            op["max"] = max(op["max"], seconds)
+            if error:
+                op["errors"] += 1
+            slow = seconds * 1000 >= self.slow_ms
+            if slow:
+                op["slow"] += 1
+                entry = {"at": datetime.now().isoformat(timespec="seconds"), "op": name,
+                         "ms": round(seconds * 1000, 1), "detail": detail or ""}
+                self._recent_slow.append(entry)
+        if slow:
+            self._log_slow(entry)
+
+    def _log_slow(self, entry):
+        if not self.slow_log:
+            return
+        if self._logger is None:
+            logger = logging.getLogger("helpdesk.slow")
+            logger.propagate = False
+            logger.setLevel(logging.WARNING)
+            if not logger.handlers:
+                handler = RotatingFileHandler(self.slow_log, maxBytes=5 * 1024 * 1024, backupCount=3,
+                                              encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+            self._logger = logger
+        self._logger.warning("%s %8.1f ms  %s  %s", entry["at"], entry["ms"], entry["op"], entry["detail"])
+
+    def snapshot(self):
+        """One dict per operation: lifetime count/errors/slow/mean plus rolling-window quantiles (ms)."""
+        with self._lock:
+            ops = {name: (sorted(op["samples"]), op["count"], op["sum"], op["errors"], op["slow"], op["max"])
+                   for name, op in self._ops.items()}
+        rows = []
+        for name, (ordered, count, total, errors, slow, mx) in sorted(ops.items()):
+            row = {"op": name, "count": count, "errors": errors, "slow": slow,
+                   "mean_ms": total / count * 1000 if count else 0.0, "max_ms": mx * 1000, "sum_s": total}
+            for q in QUANTILES:
+                row[f"p{int(q * 100)}_ms"] = _quantile(ordered, q) * 1000 if ordered else 0.0
+            rows.append(row)
+        return rows
+
+    def recent_slow(self):
+        with self._lock:
+            return list(reversed(self._recent_slow))
+
+    def reset(self):
+        with self._lock:
+            self._ops.clear()
+            self._recent_slow.clear()
+            self.started_at = datetime.now()
+
+    def prometheus_text(self):
+        """Current metrics in the Prometheus text exposition format."""
+        rows = self.snapshot()
+        lines = [
+            "# HELP helpdesk_operation_seconds Duration of instrumented helpdesk operations.",
+            "# TYPE helpdesk_operation_seconds summary",
+        ]
+        for row in rows:
+            label = _label(row["op"])
+            for q in QUANTILES:
+                lines.append(f'helpdesk_operation_seconds{{op="{label}",quantile="{q:g}"}} '
+                             f'{row[f"p{int(q * 100)}_ms"] / 1000:.6f}')
+            lines.append(f'helpdesk_operation_seconds_sum{{op="{label}"}} {row["sum_s"]:.6f}')
+            lines.append(f'helpdesk_operation_seconds_count{{op="{label}"}} {row["count"]}')
+        for metric, key, help_text in (
+                ("helpdesk_operation_errors_total", "errors", "Instrumented operations that raised."),
+                ("helpdesk_operation_slow_total", "slow", f"Operations slower than {self.slow_ms:g} ms.")):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f'{metric}{{op="{_label(row["op"])}"}} {row[key]}' for row in rows)
+        lines.append("# HELP helpdesk_metrics_start_time_seconds When these counters were last reset.")
+        lines.append("# TYPE helpdesk_metrics_start_time_seconds gauge")
+        lines.append(f"helpdesk_metrics_start_time_seconds {self.started_at.timestamp():.0f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=METRICS_FILE):
+        """Atomically replace `path` with the current metrics."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# Process-wide registry (module state survives Streamlit reruns)
+METRICS = Metrics()
+
+def instrumented(prefix, name=None):
+    """Decorator: time every call as '<prefix>.<function name>'; slow calls are logged with their arguments."""
+    def wrap(fn):
+        op = f"{prefix}.{name or fn.__name__}"
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            t0 = time.perf_counter()
+            error = False
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                elapsed = time.perf_counter() - t0
+                detail = _describe_args(args, kwargs) if elapsed * 1000 >= METRICS.slow_ms else None
+                METRICS.record(op, elapsed, error, detail)
+        return inner
+    return wrap
+
+class MetricsExporter(threading.Thread):
+    """Daemon thread that rewrites the Prometheus text file every `interval` seconds."""
+
+    def __init__(self, path=METRICS_FILE, interval=METRICS_EXPORT_SECONDS, metrics=None):
+        super().__init__(name="helpdesk-metrics", daemon=True)
+        self.path = path
+        self.interval = interval
+        self.metrics = metrics or METRICS
+        self.last_written = None
+        self.last_error = None
+        self._stopping = threading.Event()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self.join(timeout)
+
+    def run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.metrics.write_prometheus(self.path)
+                self.last_written, self.last_error = datetime.now(), None
+            except Exception as e:
+                self.last_error = str(e)
@@ -0,0 +1,84 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Near-Duplicate Detection
+---------------------------------------------------------------------
+Finds tickets describing the same problem (e.g. a dozen "mail server
+down" tickets during an outage):
+- signature(): one-permutation MinHash over character trigrams of the
+  description - each trigram is hashed once into one of SIGNATURE_SIZE
+  bins and the smallest value per bin is kept; empty bins borrow from
+  other bins along a fixed random probe order. Linear in the text.
+- band_keys(): the signature cut into LSH_BANDS bands of BAND_ROWS,
+  each hashed together with the category into a 64-bit bucket key.
+  Tickets sharing a bucket are duplicate candidates: a lookup is one
+  index probe per band (ticket_lsh in helpdesk_db), never a comparison
+  with every open ticket. With 16 bands of 4 rows a pair at trigram
+  similarity 0.6 shares a bucket ~90% of the time, one at 0.2 ~6%.
+- jaccard(): exact trigram similarity, used to confirm candidates
+  against DUPLICATE_THRESHOLD
+---------------------------------------------------------------------
+"""
+
+import hashlib
+import os
+import random
+import re
+import zlib
+from dotenv import load_dotenv
+
+load_dotenv()
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.6") or 0.6)
+SIGNATURE_SIZE = 64   # power of two: the top bits of a trigram hash pick its bin
+LSH_BANDS = 16
+BAND_ROWS = SIGNATURE_SIZE // LSH_BANDS
+MAX_TEXT_CHARS = 2000  # long log pastes add nothing to the match but cost hashing time
+
+_BIN_BITS = SIGNATURE_SIZE.bit_length() - 1
+_VALUE_BITS = 64 - _BIN_BITS
+_MIX = 0x9E3779B97F4A7C15  # spreads crc32 over 64 bits (Fibonacci hashing); the top bits pick the bin
+# fixed seed: signatures computed in different processes and releases must agree
+_rng = random.Random(20251017)
+_PROBES = [_rng.sample(range(SIGNATURE_SIZE), SIGNATURE_SIZE) for _ in range(SIGNATURE_SIZE)]
+
+def shingles(text):
+    """Character trigrams of the lower-cased words (text shorter than 3 chars kept whole)."""
+    text = " ".join(re.findall(r"\w+", (text or "").lower()[:MAX_TEXT_CHARS]))
+    if len(text) < 3:
+        return {text} if text else set()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def jaccard(a, b):
+    """Similarity of two trigram sets (0..1)."""
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def signature(text):
+    """MinHash signature (tuple of SIGNATURE_SIZE ints) of a description, or None if it has no words."""
+    bins = [None] * SIGNATURE_SIZE
+    for s in shingles(text):
+        h = (zlib.crc32(s.encode()) * _MIX) & 0xFFFFFFFFFFFFFFFF
+        i, value = h >> _VALUE_BITS, h & ((1 << _VALUE_BITS) - 1)
+        if bins[i] is None or value < bins[i]:
+            bins[i] = value
+    sig = list(bins)
+    for i, b in enumerate(bins):
+        if b is None:
+            for j in _PROBES[i]:
+                if bins[j] is not None:
+                    sig[i] = bins[j]
+                    break
+            else:
+                return None  # no words at all
+    return tuple(sig)
+
+def band_keys(category, sig):
+    """One signed 64-bit bucket key per LSH band (band number and category included)."""
+    keys = []
+    for band in range(LSH_BANDS):
+        rows = sig[band * BAND_ROWS:(band + 1) * BAND_ROWS]
+        digest = hashlib.blake2b(f"{category}|{band}|{rows}".encode(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+def duplicate_keys(category, description):
+    """Bucket keys for a ticket, or [] when the description has nothing to compare."""
+    sig = signature(description)
+    return band_keys(category or "", sig) if sig else []
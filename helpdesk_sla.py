@@ -0,0 +1,231 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - SLA Engine
+---------------------------------------------------------------------
+Per-priority resolution targets (SLA_HOURS in helpdesk_db):
+- scan_breaches(): records open tickets that crossed their target since
+  the last scan in sla_breaches. Each priority keeps a watermark, so a
+  scan only reads the (status, priority, raised_at) index range between
+  the previous cutoff and now - target, never the whole table.
+- notify_breaches(): one digest email per assignee for breaches not yet
+  notified, queued in the email outbox (sent by OutboxWorker); breaches
+  with no recipient stay pending until one is configured
+- SlaWorker: background thread running both every SLA_CHECK_SECONDS,
+  with a full reconcile every SLA_RECONCILE_SECONDS to pick up reopened
+  or re-prioritised tickets the incremental scan cannot see
+- sla_state(): On track / At risk / Breached / Met / Missed for display
+---------------------------------------------------------------------
+"""
+
+import html
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from helpdesk_db import SLA_HOURS, STATUSES, transaction
+from helpdesk_mail import IT_RECIPIENTS, queue_message
+from helpdesk_metrics import instrumented
+
+load_dotenv()
+SLA_CHECK_SECONDS = float(os.getenv("SLA_CHECK_SECONDS", "60") or 60)
+SLA_RECONCILE_SECONDS = float(os.getenv("SLA_RECONCILE_SECONDS", "3600") or 3600)
+SLA_AT_RISK_FRACTION = 0.75   # share of the target elapsed before a ticket shows "At risk"
+# "Name=email" pairs for assignees stored by name, e.g. "Prince Prajapati=itofficer@example.com;IT Support=it@example.com"
+SLA_ASSIGNEE_EMAILS = dict(
+    pair.split("=", 1) for pair in (os.getenv("SLA_ASSIGNEE_EMAILS", "") or "").split(";") if "=" in pair)
+
+OPEN_STATUSES = [s for s in STATUSES if s != "Resolved"]
+
+def _parse(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value)) if value else None
+
+def due_at(priority, raised_at):
+    hours = SLA_HOURS.get(priority)
+    raised = _parse(raised_at)
+    return raised + timedelta(hours=hours) if hours is not None and raised else None
+
+def sla_state(ticket, now=None):
+    """
+    SLA state of a ticket (dict or row with priority, status, raised_at, resolved_at).
+    Returns (state, due) where state is "" when the priority has no target.
+    """
+    due = due_at(ticket.get("priority"), ticket.get("raised_at"))
+    if due is None:
+        return "", None
+    if ticket.get("status") == "Resolved":
+        resolved = _parse(ticket.get("resolved_at"))
+        return ("Missed" if resolved and resolved > due else "Met"), due
+    now = now or datetime.now()
+    if now > due:
+        return "Breached", due
+    target = timedelta(hours=SLA_HOURS[ticket["priority"]])
+    return ("At risk" if due - now <= target * (1 - SLA_AT_RISK_FRACTION) else "On track"), due
+
+@instrumented("sla")
+def scan_breaches(conn, now=None, full=False):
+    """
+    Record tickets that became overdue since the previous scan (or all overdue open tickets
+    when `full`). Idempotent: a ticket is recorded once per priority. Returns new events.
+    """
+    now = now or datetime.now()
+    status_marks = ",".join("?" * len(OPEN_STATUSES))
+    found = 0
+    with transaction(conn):
+        marks = dict(conn.execute("SELECT priority, checked_until FROM sla_watermarks").fetchall())
+        for priority, hours in SLA_HOURS.items():
+            cutoff = (now - timedelta(hours=hours)).isoformat()
+            since = "" if full else marks.get(priority, "")
+            if cutoff <= since:
+                continue
+            cur = conn.execute(f"""
+                INSERT OR IGNORE INTO sla_breaches
+                    (ticket_id, priority, assigned_to, raised_at, due_at, detected_at)
+                SELECT ticket_id, priority, assigned_to, raised_at,
+                       strftime('%Y-%m-%dT%H:%M:%S', raised_at, ?), ?
+                FROM tickets
+                WHERE status IN ({status_marks}) AND priority = ? AND raised_at > ? AND raised_at <= ?
+            """, [f"+{hours} hours", now.isoformat()] + OPEN_STATUSES + [priority, since, cutoff])
+            found += cur.rowcount
+            conn.execute("""
+                INSERT INTO sla_watermarks (priority, checked_until) VALUES (?, ?)
+                ON CONFLICT(priority) DO UPDATE SET checked_until = MAX(checked_until, excluded.checked_until)
+            """, (priority, cutoff))
+    return found
+
+def recipients_for(assignee):
+    """Email addresses for an assignee: the value itself, SLA_ASSIGNEE_EMAILS, or the IT team."""
+    assignee = (assignee or "").strip()
+    if "@" in assignee:
+        return [assignee]
+    if assignee in SLA_ASSIGNEE_EMAILS:
+        return [SLA_ASSIGNEE_EMAILS[assignee]]
+    return list(IT_RECIPIENTS)
+
+def render_sla_digest(assignee, breaches):
+    rows = "".join(
+        f"<tr><td>{html.escape(b['ticket_id'])}</td><td>{html.escape(b['priority'])}</td>"
+        f"<td>{html.escape(b['status'] or '')}</td><td>{b['due_at'].replace('T', ' ')}</td>"
+        f"<td>{html.escape((b['description'] or '')[:120])}</td></tr>"
+        for b in breaches)
+    return f"""
+    <html><body style='font-family:Segoe UI,Arial,sans-serif;background:#f3f4f6;padding:20px;'>
+    <div style='max-width:700px;margin:auto;background:#fff;border-radius:10px;overflow:hidden;'>
+    <div style='background:#b91c1c;color:#fff;padding:12px 20px;'>
+    <b>Infinium IT Helpdesk — SLA breached</b>
+    </div>
+    <div style='padding:20px;color:#111827;'>
+    <p>Dear <b>{html.escape(assignee or 'IT Team')}</b>,</p>
+    <p>{len(breaches)} ticket(s) have passed their resolution target:</p>
+    <table style='width:100%;border-collapse:collapse;margin:10px 0;' border='1' cellpadding='4'>
+    <tr><th>Ticket ID</th><th>Priority</th><th>Status</th><th>Due</th><th>Description</th></tr>
+    {rows}
+    </table>
+    <p>Regards,<br><b>Infinium IT Helpdesk</b></p>
+    </div>
+    </div></body></html>
+    """
+
+@instrumented("sla")
+def notify_breaches(conn, now=None):
+    """
+    Queue one digest per current assignee covering every breach not yet notified
+    (tickets resolved in the meantime are left out). Breaches whose assignee has no address
+    (and no IT_RECIPIENTS fallback) keep notified_at NULL and are retried on the next run.
+    Returns the number of emails queued.
+    """
+    now = (now or datetime.now()).isoformat()
+    queued = 0
+    with transaction(conn):
+        c = conn.execute("""
+            SELECT b.id, b.ticket_id, b.priority, b.due_at, t.assigned_to, t.status, t.description
+            FROM sla_breaches b LEFT JOIN tickets t ON t.ticket_id = b.ticket_id
+            WHERE b.notified_at IS NULL
+            ORDER BY b.id
+        """)
+        cols = [d[0] for d in c.description]
+        by_assignee = defaultdict(list)
+        done = []
+        for row in c.fetchall():
+            b = dict(zip(cols, row))
+            if b["status"] in OPEN_STATUSES:
+                by_assignee[(b["assigned_to"] or "").strip()].append(b)
+            else:
+                done.append((now, None, b["id"]))
+        for assignee, breaches in by_assignee.items():
+            to_list = recipients_for(assignee)
+            if not to_list:
+                continue
+            subject = f"[SLA] {len(breaches)} ticket(s) overdue - Infinium IT Helpdesk"
+            outbox_id = queue_message(conn, subject, render_sla_digest(assignee, breaches), to_list)
+            queued += 1
+            done.extend((now, outbox_id, b["id"]) for b in breaches)
+        conn.executemany("UPDATE sla_breaches SET notified_at=?, outbox_id=? WHERE id=?", done)
+    return queued
+
+def ticket_breach(conn, ticket_id):
+    """Latest breach event for a ticket as a dict (email_status: outbox status of its digest), or None."""
+    c = conn.execute("""SELECT b.priority, b.due_at, b.detected_at, b.notified_at, b.outbox_id,
+                               o.status AS email_status
+                        FROM sla_breaches b LEFT JOIN email_outbox o ON o.id = b.outbox_id
+                        WHERE b.ticket_id=? ORDER BY b.id DESC LIMIT 1""", (ticket_id,))
+    row = c.fetchone()
+    return dict(zip([d[0] for d in c.description], row)) if row else None
+
+@instrumented("sla")
+def overdue_counts(conn, now=None):
+    """{priority: number of open tickets past target} from index range counts."""
+    now = now or datetime.now()
+    status_marks = ",".join("?" * len(OPEN_STATUSES))
+    counts = {}
+    for priority, hours in SLA_HOURS.items():
+        cutoff = (now - timedelta(hours=hours)).isoformat()
+        counts[priority] = conn.execute(
+            f"SELECT COUNT(*) FROM tickets WHERE status IN ({status_marks}) AND priority = ? AND raised_at <= ?",
+            OPEN_STATUSES + [priority, cutoff]).fetchone()[0]
+    return counts
+
+class SlaWorker(threading.Thread):
+    """
+    Daemon thread that scans for new breaches and queues their digests through the shared
+    Database writer, independently of Streamlit reruns.
+    """
+
+    def __init__(self, database, interval=SLA_CHECK_SECONDS, reconcile_seconds=SLA_RECONCILE_SECONDS,
+                 on_queued=None):
+        super().__init__(name="helpdesk-sla", daemon=True)
+        self.database = database
+        self.interval = interval
+        self.reconcile_seconds = reconcile_seconds
+        self.on_queued = on_queued
+        self.last_run = None
+        self.last_error = None
+        self._last_full = None
+        self._stopping = threading.Event()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self.join(timeout)
+
+    def run_once(self):
+        full = self._last_full is None or time.monotonic() - self._last_full >= self.reconcile_seconds
+        found = scan_breaches(self.database.writer, full=full)
+        if full:
+            self._last_full = time.monotonic()
+        queued = notify_breaches(self.database.writer)
+        if queued and self.on_queued:
+            self.on_queued()
+        self.last_run = datetime.now()
+        return found, queued
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                self.run_once()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+            self._stopping.wait(self.interval)
@@ -0,0 +1,33 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Test fixtures
+---------------------------------------------------------------------
+Tests run against a fresh database file per test (tmp_path), never
+against tickets.db. Run from the repository root:
+    python -m pytest -q
+---------------------------------------------------------------------
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpdesk_db import init_db, add_ticket  # noqa: E402
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = init_db(str(tmp_path / "tickets.db"))
+    yield conn
+    conn.close()
+
+@pytest.fixture
+def new_ticket(conn):
+    """add_ticket() with form defaults; keyword arguments override fields. Returns the ticket ID."""
+    def make(**fields):
+        data = {"employee_name": "Test User", "department": "QA", "contact": "test@example.com",
+                "identification": "", "category": "Other", "priority": "Medium", "description": "test ticket"}
+        data.update(fields)
+        return add_ticket(conn, data)
+    return make
@@ -0,0 +1,28 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Near-duplicate grouping tests
+---------------------------------------------------------------------
+"""
+
+from helpdesk_db import duplicate_groups, index_duplicates
+
+MAIL_OUTAGE = "Outlook cannot connect to the mail server, emails stuck in the outbox since morning"
+VPN_OUTAGE = "VPN client disconnects every few minutes when working from home, cannot reach SAP"
+
+def _group_ids(conn):
+    return [[d["ticket_id"] for d in g] for g in duplicate_groups(conn)]
+
+def test_outage_tickets_form_one_group_oldest_first(conn, new_ticket):
+    ids = [new_ticket(category="Email", description=MAIL_OUTAGE) for _ in range(5)]
+    assert _group_ids(conn) == [ids]
+
+def test_different_issues_sharing_a_bucket_stay_separate(conn, new_ticket):
+    mail = [new_ticket(category="Network", description=MAIL_OUTAGE) for _ in range(3)]
+    vpn = [new_ticket(category="Network", description=VPN_OUTAGE) for _ in range(2)]
+    # an LSH collision between the two issues: one extra bucket holding a ticket of each
+    index_duplicates(conn, [(mail[-1], [424242]), (vpn[0], [424242])])
+    assert sorted(_group_ids(conn)) == sorted([mail, vpn])
+
+def test_unrelated_tickets_are_not_grouped(conn, new_ticket):
+    new_ticket(category="Network", description=MAIL_OUTAGE)
+    new_ticket(category="Network", description=VPN_OUTAGE)
+    assert _group_ids(conn) == []
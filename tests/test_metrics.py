@@ -0,0 +1,27 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Metrics tests
+---------------------------------------------------------------------
+"""
+
+import helpdesk_metrics
+from helpdesk_metrics import Metrics, instrumented
+
+def test_slow_log_keeps_personal_data_out(tmp_path, monkeypatch):
+    log = tmp_path / "slow.log"
+    metrics = Metrics(slow_ms=0, slow_log=str(log))
+    monkeypatch.setattr(helpdesk_metrics, "METRICS", metrics)
+
+    @instrumented("db")
+    def add_ticket(conn, data, limit=10):
+        return None
+
+    add_ticket(None, {"employee_name": "Jane Doe", "contact": "jane@example.com",
+                      "description": "laptop stolen from car", "attachment": b"\x89PNG" * 100,
+                      "raised_at": "2026-10-03T09:15:00"}, limit=5)
+    for handler in metrics._logger.handlers:
+        handler.flush()
+    text = log.read_text(encoding="utf-8")
+    assert "db.add_ticket" in text
+    for secret in ("Jane", "jane@example.com", "laptop", "PNG"):
+        assert secret not in text
+    assert "<bytes 400>" in text and "2026-10-03T09:15:00" in text and "limit=5" in text
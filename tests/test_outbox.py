@@ -0,0 +1,139 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Email outbox tests
+---------------------------------------------------------------------
+The outbox is drained into a local aiosmtpd server (AUTH LOGIN/PLAIN
+without TLS), so the real SMTPSession code path is exercised.
+---------------------------------------------------------------------
+"""
+
+import socket
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+aiosmtpd = pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller  # noqa: E402
+from aiosmtpd.smtp import AuthResult, LoginPassword  # noqa: E402
+
+from helpdesk_db import Database  # noqa: E402
+from helpdesk_mail import (  # noqa: E402
+    OUTBOX_MAX_ATTEMPTS, OutboxWorker, SMTPNotConfigured, SMTPSession, backoff_seconds, process_outbox,
+    queue_message,
+)
+
+USER, PASSWORD = "helpdesk", "secret"
+
+class Inbox:
+    """aiosmtpd handler: stores accepted messages; `reject` is an SMTP reply to send instead."""
+
+    def __init__(self):
+        self.messages = []
+        self.reject = None
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.reject:
+            return self.reject
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+def _authenticate(server, session, envelope, mechanism, auth_data):
+    ok = isinstance(auth_data, LoginPassword) and auth_data.login.decode() == USER \
+        and auth_data.password.decode() == PASSWORD
+    return AuthResult(success=ok)
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@pytest.fixture
+def smtp_server():
+    inbox = Inbox()
+    controller = Controller(inbox, hostname="127.0.0.1", port=_free_port(), authenticator=_authenticate,
+                            auth_require_tls=False)
+    controller.start()
+    yield controller, inbox
+    controller.stop()
+
+@pytest.fixture
+def session(smtp_server):
+    controller, _ = smtp_server
+    session = SMTPSession(host=controller.hostname, port=controller.port, user=USER, password=PASSWORD,
+                          starttls=False, from_email="helpdesk@example.com", timeout=5)
+    yield session
+    session.close()
+
+def _outbox_row(conn, msg_id):
+    c = conn.execute("SELECT status, attempts, next_attempt_at, last_error FROM email_outbox WHERE id=?",
+                     (msg_id,))
+    return dict(zip([d[0] for d in c.description], c.fetchone()))
+
+def test_sends_over_smtp(conn, smtp_server, session):
+    _, inbox = smtp_server
+    msg_id = queue_message(conn, "Ticket updated", "<p>done</p>", ["user@example.com"], cc=["it@example.com"])
+    assert process_outbox(conn, session) == (1, 0)
+    assert _outbox_row(conn, msg_id)["status"] == "sent"
+    assert len(inbox.messages) == 1
+    envelope = inbox.messages[0]
+    assert envelope.mail_from == "helpdesk@example.com"
+    assert sorted(envelope.rcpt_tos) == ["it@example.com", "user@example.com"]
+    assert b"Subject: Ticket updated" in envelope.content
+
+def test_failure_is_retried_after_backoff(conn, smtp_server, session):
+    _, inbox = smtp_server
+    msg_id = queue_message(conn, "Retry me", "<p>x</p>", ["user@example.com"])
+    inbox.reject = "451 Temporary failure, try again later"
+    before = datetime.now()
+    assert process_outbox(conn, session) == (0, 1)
+    row = _outbox_row(conn, msg_id)
+    assert row["status"] == "pending" and row["attempts"] == 1 and "451" in row["last_error"]
+    retry_at = datetime.fromisoformat(row["next_attempt_at"])
+    assert retry_at >= before + timedelta(seconds=backoff_seconds(1))
+    inbox.reject = None
+    assert process_outbox(conn, session) == (0, 0)  # not due yet
+    assert process_outbox(conn, session, now=retry_at + timedelta(seconds=1)) == (1, 0)
+    assert _outbox_row(conn, msg_id)["status"] == "sent"
+    assert len(inbox.messages) == 1
+
+def test_marked_failed_after_max_attempts(conn, smtp_server, session):
+    _, inbox = smtp_server
+    msg_id = queue_message(conn, "Never delivered", "<p>x</p>", ["user@example.com"])
+    inbox.reject = "554 Transaction failed"
+    later = datetime.now()
+    for attempt in range(1, OUTBOX_MAX_ATTEMPTS + 1):
+        later += timedelta(seconds=backoff_seconds(attempt) + 1)
+        assert process_outbox(conn, session, now=later) == (0, 1)
+    row = _outbox_row(conn, msg_id)
+    assert row["status"] == "failed" and row["attempts"] == OUTBOX_MAX_ATTEMPTS
+    assert process_outbox(conn, session, now=later + timedelta(days=1)) == (0, 0)
+
+def test_unconfigured_session_never_connects(conn):
+    msg_id = queue_message(conn, "No SMTP", "<p>x</p>", ["user@example.com"])
+    session = SMTPSession(host="127.0.0.1", port=_free_port(), user="", password="", from_email="")
+    with pytest.raises(SMTPNotConfigured):
+        process_outbox(conn, session)
+    with pytest.raises(SMTPNotConfigured):
+        session.send("No SMTP", "<p>x</p>", ["user@example.com"])
+    row = _outbox_row(conn, msg_id)
+    assert row["status"] == "pending" and row["attempts"] == 0
+
+def test_worker_drains_outbox(tmp_path, smtp_server):
+    controller, inbox = smtp_server
+    database = Database(str(tmp_path / "worker.db"))
+    worker = OutboxWorker(database, poll_seconds=0.05, session_factory=lambda: SMTPSession(
+        host=controller.hostname, port=controller.port, user=USER, password=PASSWORD, starttls=False,
+        from_email="helpdesk@example.com", timeout=5))
+    worker.start()
+    try:
+        for n in range(3):
+            queue_message(database.writer, f"Digest {n}", "<p>x</p>", ["user@example.com"])
+        worker.wake()
+        deadline = time.monotonic() + 10
+        while len(inbox.messages) < 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert len(inbox.messages) == 3
+        assert worker.last_error is None
+    finally:
+        worker.stop(timeout=5)
+        database.close()
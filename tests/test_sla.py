@@ -0,0 +1,33 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - SLA notification tests
+---------------------------------------------------------------------
+"""
+
+from datetime import datetime, timedelta
+
+import helpdesk_sla
+from helpdesk_db import update_ticket
+from helpdesk_sla import scan_breaches, notify_breaches, ticket_breach
+
+LATER = datetime.now() + timedelta(hours=30)  # past the Medium target (24 h)
+
+def test_breach_without_recipient_stays_pending(conn, new_ticket, monkeypatch):
+    monkeypatch.setattr(helpdesk_sla, "IT_RECIPIENTS", [])
+    ticket_id = new_ticket()  # new tickets are unassigned
+    assert scan_breaches(conn, now=LATER, full=True) == 1
+    assert notify_breaches(conn, now=LATER) == 0
+    breach = ticket_breach(conn, ticket_id)
+    assert breach["notified_at"] is None and breach["outbox_id"] is None
+    # picked up once a recipient exists
+    monkeypatch.setattr(helpdesk_sla, "IT_RECIPIENTS", ["it@example.com"])
+    assert notify_breaches(conn, now=LATER) == 1
+    breach = ticket_breach(conn, ticket_id)
+    assert breach["notified_at"] and breach["outbox_id"] and breach["email_status"] == "pending"
+
+def test_one_digest_per_assignee(conn, new_ticket, monkeypatch):
+    monkeypatch.setattr(helpdesk_sla, "IT_RECIPIENTS", [])
+    for _ in range(3):
+        update_ticket(conn, new_ticket(), {"assigned_to": "tech@example.com"})
+    scan_breaches(conn, now=LATER, full=True)
+    assert notify_breaches(conn, now=LATER) == 1
+    assert notify_breaches(conn, now=LATER) == 0
@@ -0,0 +1,25 @@
+"""
+Infinium Pharmachem Limited | IT Helpdesk - Ticket list filter tests
+---------------------------------------------------------------------
+"""
+
+from helpdesk_db import query_tickets, update_ticket, _filter_clause
+
+def _ids(conn, filters):
+    df, _ = query_tickets(conn, filters)
+    return set(df["ticket_id"])
+
+def test_assignee_filter(conn, new_ticket):
+    a, b, c = new_ticket(), new_ticket(), new_ticket()
+    update_ticket(conn, a, {"assigned_to": "IT Support"})
+    update_ticket(conn, b, {"assigned_to": None})  # stored as unassigned, not NULL
+    assert _ids(conn, {"assigned_to": "IT Support"}) == {a}
+    assert _ids(conn, {"assigned_to": ""}) == {b, c}
+
+def test_assignee_filter_uses_index(conn):
+    for assignee in ("IT Support", ""):
+        where, params = _filter_clause({"assigned_to": assignee})
+        plan = " ".join(r[3] for r in conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT id FROM tickets WHERE {' AND '.join(where)} "
+            f"ORDER BY raised_at DESC, id DESC LIMIT 26", params))
+        assert "idx_tickets_assigned" in plan